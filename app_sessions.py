@@ -0,0 +1,169 @@
+import json
+import os
+import threading
+import time
+from array import array
+from bisect import bisect_left, bisect_right
+
+# ==========================================
+# PER-APP SESSION LOG
+# ==========================================
+# Focus time as run-length intervals: (app, start, end), wall-clock epoch
+# seconds. Consecutive samples of the same app extend the open run instead
+# of adding rows. Closed runs live in flat arrays (8+8+4 bytes each) and
+# are appended to SESSIONS_FILE as one short JSON line each.
+#
+# Runs never overlap and arrive in time order, so a range query is two
+# bisects plus, per app, two bisects into that app's prefix sums:
+# O(apps * log runs), however many runs the day has collected.
+#
+# Only the last RETENTION_DAYS are kept: older runs are skipped on load and
+# compact() (run at startup and every day change) drops them from memory
+# and rewrites the file without them.
+
+SESSIONS_FILE = "app_sessions.jsonl"
+MERGE_GAP = 2.0  # Seconds; a sample this close to the open run's end extends it
+RETENTION_DAYS = 30
+
+
+class SessionLog:
+    def __init__(self, path=SESSIONS_FILE, retention_days=RETENTION_DAYS):
+        self.path = path
+        self.retention = retention_days * 86400
+        self.apps = []  # app id -> name
+        self._app_ids = {}
+        self._clear()
+        self.open = None  # [app id, start, end] of the run still growing
+        self._lock = threading.Lock()
+        self._load()
+
+    def _clear(self):
+        self.starts = array("d")
+        self.ends = array("d")
+        self.app_ids = array("I")
+        self._runs = {}  # app id -> (array of run indexes, array of prefix durations)
+
+    # --- Writing ---
+
+    def record(self, app, start, end):
+        """`app` had focus from start to end. Merges into the open run when it continues it."""
+        if not app or end <= start:
+            return
+        with self._lock:
+            app_id = self._app_id(app)
+            if self.open and self.open[0] == app_id and start - self.open[2] <= MERGE_GAP:
+                self.open[2] = max(self.open[2], end)
+                return
+            self._close()
+            self.open = [app_id, start, end]
+
+    def close(self):
+        """Ends the open run (focus moved to nothing / tracker stopping)."""
+        with self._lock:
+            self._close()
+
+    def _close(self):
+        if self.open is None:
+            return
+        app_id, start, end = self.open
+        self.open = None
+        self._add(app_id, start, end)
+        try:
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.write(json.dumps([start, end, self.apps[app_id]]) + "\n")
+        except OSError as e:
+            print(f"Could not save session: {e}")
+
+    def _app_id(self, app):
+        app_id = self._app_ids.get(app)
+        if app_id is None:
+            app_id = self._app_ids[app] = len(self.apps)
+            self.apps.append(app)
+        return app_id
+
+    def _add(self, app_id, start, end):
+        if self.ends and start < self.ends[-1]:
+            start = self.ends[-1]  # Clock went back; keep runs ordered and disjoint
+            if end <= start:
+                return
+        index = len(self.starts)
+        self.starts.append(start)
+        self.ends.append(end)
+        self.app_ids.append(app_id)
+        runs = self._runs.get(app_id)
+        if runs is None:
+            runs = self._runs[app_id] = (array("I"), array("d", [0.0]))
+        runs[0].append(index)
+        runs[1].append(runs[1][-1] + (end - start))
+
+    def _load(self):
+        if not os.path.exists(self.path):
+            return
+        cutoff = time.time() - self.retention
+        dropped = 0
+        with open(self.path, "r", encoding="utf-8", errors="replace") as f:
+            for line in f:
+                try:
+                    start, end, app = json.loads(line)
+                except ValueError:
+                    dropped += 1
+                    continue  # Torn last line
+                if float(end) <= cutoff:
+                    dropped += 1
+                    continue
+                self._add(self._app_id(app), float(start), float(end))
+        if dropped:
+            self._rewrite()
+
+    # --- Retention ---
+
+    def compact(self):
+        """Drops closed runs that ended before the retention window, in memory and on disk."""
+        with self._lock:
+            first = bisect_right(self.ends, time.time() - self.retention)
+            if not first:
+                return
+            kept = [(self.app_ids[i], self.starts[i], self.ends[i]) for i in range(first, len(self.starts))]
+            self._clear()
+            for run in kept:
+                self._add(*run)
+            self._rewrite()
+
+    def _rewrite(self):
+        """Replaces the file with the runs in memory (atomically)."""
+        tmp = self.path + ".tmp"
+        try:
+            with open(tmp, "w", encoding="utf-8") as f:
+                for i in range(len(self.starts)):
+                    f.write(json.dumps([self.starts[i], self.ends[i], self.apps[self.app_ids[i]]]) + "\n")
+            os.replace(tmp, self.path)
+        except OSError as e:
+            print(f"Could not compact {self.path}: {e}")
+
+    # --- Reading ---
+
+    def totals(self, start, end):
+        """{app: seconds focused within [start, end)}, biggest first (only the retained days)."""
+        with self._lock:
+            seconds = {}
+            lo = bisect_right(self.ends, start)  # First run ending after `start`
+            hi = bisect_left(self.starts, end)   # Runs from here on start at/after `end`
+            if lo < hi:
+                for app_id, (indexes, prefix) in self._runs.items():
+                    a = bisect_left(indexes, lo)
+                    b = bisect_left(indexes, hi)
+                    if a < b:
+                        seconds[app_id] = prefix[b] - prefix[a]
+                # Only the two boundary runs can stick out of the range
+                for i in {lo, hi - 1}:
+                    overhang = max(0.0, start - self.starts[i]) + max(0.0, self.ends[i] - end)
+                    seconds[self.app_ids[i]] -= overhang
+
+            if self.open:
+                app_id, run_start, run_end = self.open
+                overlap = min(run_end, end) - max(run_start, start)
+                if overlap > 0:
+                    seconds[app_id] = seconds.get(app_id, 0.0) + overlap
+
+            result = {self.apps[a]: round(s, 1) for a, s in seconds.items() if s > 0}
+        return dict(sorted(result.items(), key=lambda item: item[1], reverse=True))
@@ -0,0 +1,416 @@
+import heapq
+import itertools
+import multiprocessing
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import ExitStack
+from datetime import date, datetime, timedelta
+
+from day_index import DayIndex
+from features import RECENT_DAYS, recent_window_start
+from heavy_hitters import SpaceSaving, merge_sketches
+from call_monitor import CallLogReader, CallType, BaselineComparator, WellBeingEstimator, list_users, parse_log_record
+
+# ==========================================
+# INCREMENTAL ANALYTICS
+# ==========================================
+# Running per-day aggregates over the call log. Each new log touches one
+# day bucket and a few counters, so answering /api/analyze never needs
+# to rescan the raw entries. Recent/baseline windows come from a
+# prefix-sum DayIndex over the day buckets (calendar days; the default
+# recent window is today and the 6 before it), so any window pair is O(1).
+# Contact sketches are kept per day and rolled up per month, so a window's
+# top contacts merge whole months plus the days of its two edge months.
+
+RECENT_LOG_LIMIT = 10  # Newest logs kept for the dashboard list
+TOP_CONTACTS = 5  # Default top-K in the analysis response
+DAY_SKETCH_SIZE = 64  # Contacts tracked per day (exact below that many per day)
+
+
+def time_of_day(hour):
+    if 6 <= hour < 12:
+        return "Morning"
+    if 12 <= hour < 18:
+        return "Afternoon"
+    return "Night"
+
+
+class DayBucket:
+    __slots__ = ("count", "valid", "duration", "missed", "contacts")
+
+    def __init__(self):
+        self.count = 0     # All calls
+        self.valid = 0     # Answered calls (not missed)
+        self.duration = 0  # Seconds, answered calls only
+        self.missed = 0
+        self.contacts = None  # SpaceSaving of the day's callers, created on first call
+
+
+class CallAnalytics:
+    def __init__(self):
+        self.days = {}  # date -> DayBucket
+        self.contacts = SpaceSaving()  # Bounded heavy-hitter counts, all calls
+        self.months = {}  # (year, month) -> SpaceSaving of that month's callers
+        self.by_type = {t.value: SpaceSaving() for t in CallType}
+        self.top_contact = ("N/A", 0)
+        self.time_dist = {"Morning": 0, "Afternoon": 0, "Night": 0}
+        self.last_day = None
+        self.total = 0
+        self.valid = 0
+        self.duration = 0
+        self._recent = []  # min-heap of (timestamp, seq, entry)
+        self._seq = itertools.count()
+        self._lock = threading.Lock()
+        self.version = 0  # Bumped on every update; keys the cached DayIndex
+
+    @classmethod
+    def from_entries(cls, entries):
+        analytics = cls()
+        analytics.add_entries(entries)
+        return analytics
+
+    # Picklable (for process pools): the lock and sequence counter are recreated
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        del state["_lock"], state["_seq"]
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._lock = threading.Lock()
+        self._seq = itertools.count(max((seq for _, seq, _ in self._recent), default=-1) + 1)
+
+    # --- Updates ---
+
+    def add_records(self, records):
+        """Store write listener: raw log dicts in, aggregates updated."""
+        entries = []
+        for item in records:
+            try:
+                entries.append(parse_log_record(item))
+            except Exception as e:
+                print(f"Analytics: skipping bad log {item}: {e}")
+        self.add_entries(entries)
+
+    def add_entries(self, entries):
+        with self._lock:
+            for entry in entries:
+                self._add(entry)
+            self.version += 1
+
+    def _add(self, entry):
+        day = entry.timestamp.date()
+        bucket = self.days.get(day)
+        if bucket is None:
+            bucket = self.days[day] = DayBucket()
+            if self.last_day is None or day > self.last_day:
+                self.last_day = day
+        bucket.count += 1
+        self.total += 1
+        if bucket.contacts is None:
+            bucket.contacts = SpaceSaving(DAY_SKETCH_SIZE)
+        bucket.contacts.add(entry.name)
+        month = self.months.get((day.year, day.month))
+        if month is None:
+            month = self.months[(day.year, day.month)] = SpaceSaving()
+        month.add(entry.name)
+        self.by_type[entry.call_type.value].add(entry.name)
+        if entry.call_type == CallType.MISSED:
+            bucket.missed += 1
+        else:
+            bucket.valid += 1
+            bucket.duration += entry.duration_sec
+            self.valid += 1
+            self.duration += entry.duration_sec
+
+        # Counts only grow, so the leader can be tracked on the fly
+        self.contacts.add(entry.name)
+        count = self.contacts.counts[entry.name]
+        if count > self.top_contact[1]:
+            self.top_contact = (entry.name, count)
+
+        self.time_dist[time_of_day(entry.timestamp.hour)] += 1
+
+        item = (entry.timestamp, next(self._seq), entry)
+        if len(self._recent) < RECENT_LOG_LIMIT:
+            heapq.heappush(self._recent, item)
+        elif item[0] > self._recent[0][0]:
+            heapq.heapreplace(self._recent, item)
+
+
+class AnalyticsView:
+    """
+    Read-only combination of several CallAnalytics (e.g. live real logs +
+    the synthetic baseline) without merging their day maps.
+    Cost depends on the window size and the smaller parts, not on history length.
+    """
+
+    def __init__(self, parts, now=None):
+        # Largest part first; the rest are only ever iterated
+        self.parts = sorted(parts, key=lambda p: len(p.days), reverse=True)
+        self.now = now or datetime.now()
+
+    @property
+    def version(self):
+        """Changes whenever any part's aggregates change (or the set of parts does)."""
+        return tuple((id(p), p.version) for p in self.parts)
+
+    def _top_contact(self):
+        if len(self.parts) == 1:
+            return self.parts[0].top_contact
+        top = merge_sketches(p.contacts for p in self.parts).top(1)
+        return top[0] if top else ("N/A", 0)
+
+    def top_contacts(self, k=TOP_CONTACTS, recent_days=RECENT_DAYS, baseline_days=None):
+        """
+        Top-k contacts for the recent window, the baseline window and per call
+        type, from the heavy-hitter sketches (day sketches merged per window).
+        """
+        recent_start = recent_window_start(self.now, recent_days)
+        baseline_start = None if baseline_days is None else recent_start - timedelta(days=baseline_days)
+        with self._locked():
+            recent, baseline = [], []
+            for part in self.parts:
+                recent.extend(window_sketches(part, recent_start, None))
+                baseline.extend(window_sketches(part, baseline_start, recent_start))
+            by_type = {
+                t.value: merge_sketches(p.by_type[t.value] for p in self.parts)
+                for t in CallType
+            }
+
+        def listing(sketch):
+            return [{"name": name, "count": count} for name, count in sketch.top(k)]
+
+        return {
+            "recent": listing(merge_sketches(recent)),
+            "baseline": listing(merge_sketches(baseline)),
+            "by_type": {key: listing(sketch) for key, sketch in by_type.items()}
+        }
+
+    def _index(self):
+        """Prefix-sum index over the combined day buckets; rebuilt only after a write."""
+        versions = tuple(p.version for p in self.parts)
+        cached = _indexes.get(id(self.parts[0]))
+        if cached and cached[0] == self.parts and cached[1] == versions:
+            return cached[2]
+        buckets = {}
+        for part in self.parts:
+            for day, b in part.days.items():
+                bucket = buckets.get(day)
+                if bucket is None:
+                    bucket = buckets[day] = DayBucket()
+                bucket.count += b.count
+                bucket.valid += b.valid
+                bucket.duration += b.duration
+                bucket.missed += b.missed
+        index = DayIndex(buckets)
+        _indexes[id(self.parts[0])] = (list(self.parts), versions, index)
+        return index
+
+    def _locked(self):
+        # Builds run on worker threads; a fixed lock order keeps two views from deadlocking
+        stack = ExitStack()
+        for part in sorted(self.parts, key=id):
+            stack.enter_context(part._lock)
+        return stack
+
+    def compute(self, recent_days=RECENT_DAYS, baseline_days=None):
+        """
+        Returns (stats, comparison_data, anomalies) matching FeatureExtractor / BaselineComparator.
+        Recent = the last `recent_days` calendar days (plus anything dated later);
+        baseline = the `baseline_days` before that, or everything before it when None.
+        """
+        with self._locked():
+            return self._compute(recent_days, baseline_days)
+
+    def _compute(self, recent_days, baseline_days):
+        index = self._index()
+        everything = index.window()
+        total = everything["count"]
+        if not total:
+            stats = {
+                "avg_calls_per_day": 0,
+                "avg_duration_sec": 0,
+                "most_contacted": ("N/A", 0),
+                "recent_7day_count": 0,
+                "time_dist": {"Morning": 0, "Afternoon": 0, "Night": 0}
+            }
+            return stats, {}, []
+
+        # Webhook clocks can run ahead; days after today count as recent too
+        recent_start = recent_window_start(self.now, recent_days)
+        recent = index.window(recent_start, None)
+        baseline_start = None if baseline_days is None else recent_start - timedelta(days=baseline_days)
+        baseline = index.window(baseline_start, recent_start)
+
+        stats = {
+            "avg_calls_per_day": round(total / everything["days"], 1),
+            "avg_duration_sec": int(everything["duration"] / everything["valid"]) if everything["valid"] else 0,
+            "most_contacted": self._top_contact(),
+            "recent_7day_count": recent["count"],
+            "time_dist": {
+                key: sum(p.time_dist[key] for p in self.parts)
+                for key in ("Morning", "Afternoon", "Night")
+            }
+        }
+
+        if not baseline["count"]:
+            return stats, {}, []
+
+        baseline_freq = baseline["count"] / baseline["days"]
+        recent_freq = recent["count"] / recent["days"] if recent["days"] else 0
+        baseline_dur = baseline["duration"] / baseline["valid"] if baseline["valid"] else 0
+        recent_dur = recent["duration"] / recent["valid"] if recent["valid"] else 0
+
+        comparison_data = {
+            "baseline_freq": round(baseline_freq, 1),
+            "recent_freq": round(recent_freq, 1),
+            "baseline_dur": int(baseline_dur),
+            "recent_dur": int(recent_dur)
+        }
+        anomalies = BaselineComparator.detect_anomalies(
+            baseline_freq, recent_freq, baseline_dur, recent_dur, recent["count"]
+        )
+        return stats, comparison_data, anomalies
+
+    def timeseries(self, start, end, bucket="day"):
+        """Per-day or per-week totals for start <= day < end, O(buckets)."""
+        with self._locked():
+            return self._index().series(start, end, bucket)
+
+    def recent_logs(self, limit=RECENT_LOG_LIMIT):
+        items = []
+        for part in self.parts:
+            with part._lock:
+                items.extend(part._recent)
+        items.sort(key=lambda x: (x[0], x[1]), reverse=True)
+        return [entry for _, _, entry in items[:limit]]
+
+
+def window_sketches(analytics, start, end):
+    """
+    Contact sketches covering start <= day < end (None = unbounded): the
+    month rollup for every month fully inside, day sketches for the rest.
+    """
+    sketches = []
+    for (year, month), sketch in analytics.months.items():
+        first = date(year, month, 1)
+        following = date(year + month // 12, month % 12 + 1, 1)
+        if (end is not None and first >= end) or (start is not None and following <= start):
+            continue
+        if (start is None or first >= start) and (end is None or following <= end):
+            sketches.append(sketch)
+            continue
+        day = max(first, start) if start is not None else first
+        stop = min(following, end) if end is not None else following
+        while day < stop:
+            bucket = analytics.days.get(day)
+            if bucket is not None:
+                sketches.append(bucket.contacts)
+            day += timedelta(days=1)
+    return sketches
+
+
+# Last DayIndex per view, keyed by its largest part (checked against parts + versions)
+_indexes = {}
+
+
+# One live engine per log store, fed by the store's write listener
+_live = {}
+_live_lock = threading.Lock()
+
+
+def live_analytics(store):
+    with _live_lock:
+        analytics = _live.get(store.path)
+        if analytics is None:
+            analytics = CallAnalytics()
+            store.subscribe(analytics.add_records, replay=True)
+            _live[store.path] = analytics
+        return analytics
+
+
+# Aggregates of each user's synthetic baseline, rebuilt when the day changes
+_synthetic = {}
+
+
+def synthetic_analytics(reader, live):
+    """Today's synthetic baseline as CallAnalytics, or None once padding is not wanted."""
+    if not reader.use_synthetic_padding(len(live.days)):
+        return None
+    logs = reader.synthetic_history()
+    cached = _synthetic.get(reader.user_id)
+    if cached is None or cached[0] is not logs:
+        cached = (logs, CallAnalytics.from_entries(logs))
+        _synthetic[reader.user_id] = cached
+    return cached[1]
+
+
+def format_log(log):
+    """A log entry as the dashboard lists it."""
+    return {
+        "name": log.name,
+        "type": log.call_type.value,
+        "duration": log.duration_sec,
+        "date": log.timestamp.strftime("%b %d, %H:%M")
+    }
+
+
+def analysis_view(reader):
+    """Live aggregates of REAL logs + the cached synthetic baseline (if still needed)."""
+    live = live_analytics(reader.store)
+    parts = [live]
+    synthetic = synthetic_analytics(reader, live)
+    if synthetic is not None:
+        parts.append(synthetic)
+    return AnalyticsView(parts)
+
+
+def build_analysis(reader, recent_days=RECENT_DAYS, baseline_days=None, top_k=TOP_CONTACTS):
+    """Runs the analysis for the dashboard and returns the response dict."""
+    # 1. The live aggregates are updated on every write, so nothing is rescanned here
+    view = analysis_view(reader)
+
+    # 2 & 3. Features + Baseline Comparison from the day index
+    stats, comparison_data, anomalies = view.compute(recent_days, baseline_days)
+
+    # 4. Estimate Status
+    estimator = WellBeingEstimator(anomalies, stats['most_contacted'])
+    estimator.estimate()
+
+    # Prepare JSON response
+    response = {
+        "status": estimator.status,
+        "reason": estimator.reason,
+        "suggestion": estimator.suggestion,
+        "metrics": {
+            "calls_per_day": stats['avg_calls_per_day'],
+            "avg_duration": stats['avg_duration_sec'],
+            "most_contacted": stats['most_contacted'][0],
+            "recent_count": stats['recent_7day_count'],
+        },
+        "time_distribution": stats['time_dist'],
+        "comparison": comparison_data,
+        "top_contacts": view.top_contacts(top_k, recent_days, baseline_days),
+        "windows": {"recent_days": recent_days, "baseline_days": baseline_days},
+        "recent_logs": [format_log(log) for log in view.recent_logs(10)]
+    }
+
+    return response
+
+
+def analyze_user(user_id):
+    """Process-pool worker: the dashboard analysis for one user's partition."""
+    return user_id, build_analysis(CallLogReader(user_id))
+
+
+def analyze_all_users(max_workers=None):
+    """
+    Bulk job: analyzes every partition in parallel processes.
+    Spawned (not forked) workers, so no lock held by a server thread leaks into them.
+    """
+    users = list_users()
+    context = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(max_workers=max_workers, mp_context=context) as pool:
+        return dict(pool.map(analyze_user, users))
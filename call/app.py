@@ -1,17 +1,47 @@
 from fastapi import FastAPI, Request, BackgroundTasks, Body
-from fastapi.responses import HTMLResponse, JSONResponse
+from fastapi.responses import HTMLResponse, JSONResponse, Response, StreamingResponse
 from fastapi.staticfiles import StaticFiles
 from fastapi.templating import Jinja2Templates
 from pydantic import BaseModel, Field, validator
 from typing import Optional, Union
 import uvicorn
+import asyncio
 import datetime
-import os
+import re
 import json
-from call_monitor import CallLogReader, FeatureExtractor, BaselineComparator, WellBeingEstimator
+from call_monitor import CallLogReader, DEFAULT_USER
+from analytics import RECENT_DAYS, TOP_CONTACTS, analysis_view, build_analysis, analyze_all_users, format_log
+from models import parse_log_record
+from event_stream import AnalysisStream, close_on_exit_signal
+from day_index import parse_day
+from payload_capture import PayloadCapture
+from response_cache import VersionedResponseCache, etag_matches
+from log_writer import GroupCommitWriter
+import config
 
 app = FastAPI()
 
+# Debug capture of raw webhook bodies (bounded, written in the background)
+payload_capture = PayloadCapture(
+    config.DEBUG_CAPTURE_FILE,
+    size=config.DEBUG_CAPTURE_SIZE,
+    sample_rate=config.DEBUG_CAPTURE_SAMPLE_RATE,
+    enabled=config.DEBUG_CAPTURE_ENABLED,
+    flush_interval=config.DEBUG_CAPTURE_FLUSH_SEC
+)
+
+# All webhook writes go through one group-commit thread (one fsync per batch)
+log_writer = GroupCommitWriter(max_wait=config.LOG_WRITER_MAX_WAIT_SEC)
+
+# Serialized /api/analyze answers per user, valid while the aggregates they came from are unchanged
+analysis_caches = {}
+
+def analysis_cache_for(reader):
+    cache = analysis_caches.get(reader.user_id)
+    if cache is None:
+        cache = analysis_caches.setdefault(reader.user_id, VersionedResponseCache())
+    return cache
+
 # Mount Static Files
 app.mount("/static", StaticFiles(directory="static"), name="static")
 
@@ -38,6 +68,121 @@ class LogItem(BaseModel):
             return int(float(clean_v))
         return v
 
+# Live SSE channels per user (see event_stream.py)
+analysis_streams = {}
+
+async def analysis_stream_for(user_id):
+    stream = analysis_streams.get(user_id)
+    if stream is None:
+        # Opening the store and the first replay into the live aggregates read the
+        # whole log, so they run off the loop. The aggregates subscribe first, so
+        # they are current when the stream recomputes.
+        reader = await asyncio.to_thread(CallLogReader, user_id)
+        await asyncio.to_thread(analysis_view, reader)
+        stream = analysis_streams.get(user_id)
+        if stream is None:
+            stream = AnalysisStream(
+                asyncio.get_running_loop(),
+                build=lambda: build_analysis(reader),
+                format_records=lambda records: [format_log(parse_log_record(r)) for r in records]
+            )
+            analysis_streams[user_id] = stream
+            reader.store.subscribe(stream.on_write)
+    return stream
+
+def close_streams():
+    for stream in list(analysis_streams.values()):
+        stream.close()
+
+# --- Users / Partitions ---
+
+USER_KEY_PATTERN = re.compile(r"^[A-Za-z0-9_-]{1,64}$")
+
+def resolve_user(request):
+    """
+    Whose phone is this? `?user=` or an X-Device-Token header; neither means the default user.
+    Returns None for keys that aren't safe to use as a folder name.
+    """
+    user = request.query_params.get("user") or request.headers.get("x-device-token") or DEFAULT_USER
+    if not USER_KEY_PATTERN.match(user):
+        return None
+    return user
+
+def bad_user_response():
+    return JSONResponse(status_code=400, content={"status": "error", "message": "Invalid user key"})
+
+# --- Payload Cleaning ---
+
+def clean_call_record(raw_body):
+    """
+    Turns one raw MacroDroid/Tasker payload into a clean log dict.
+    Returns None if the payload isn't a JSON object.
+    """
+    # MacroDroid might send strings for everything. Let's be lenient.
+    if not isinstance(raw_body, dict):
+        return None
+
+    # Parse 'duration' safely
+    dur = raw_body.get('duration', 0)
+    if isinstance(dur, str) and dur.replace('.','',1).isdigit():
+        dur = int(float(dur)) # handle "45.0"
+    elif not isinstance(dur, (int, float)):
+        dur = 0
+    
+    # Handle name extraction robustly (empty or None -> "Unknown")
+    raw_name = raw_body.get('name')
+    if not raw_name or str(raw_name).strip() == "":
+        final_name = "Unknown"
+    else:
+        final_name = str(raw_name)
+
+    # Construct cleaned data
+    return {
+        "name": final_name,
+        "number": str(raw_body.get('number', '')),
+        "duration": int(dur),
+        "type": str(raw_body.get('type', 'INCOMING')).upper(),
+        "timestamp": raw_body.get('timestamp', datetime.datetime.now().isoformat())
+    }
+
+def parse_batch_body(text):
+    """Accepts a JSON array (or single object) or an NDJSON stream. Returns a list of raw items."""
+    text = text.strip()
+    if not text:
+        return []
+    try:
+        parsed = json.loads(text)
+        return parsed if isinstance(parsed, list) else [parsed]
+    except ValueError:
+        pass
+
+    items = []
+    for line in text.splitlines():
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            items.append(json.loads(line))
+        except ValueError:
+            items.append(line) # Rejected later as not an object
+    return items
+
+# --- Lifecycle ---
+
+@app.on_event("startup")
+async def startup():
+    log_writer.start()
+    await payload_capture.start()
+    # Open event streams would otherwise keep uvicorn from ever reaching shutdown
+    close_on_exit_signal(close_streams)
+
+@app.on_event("shutdown")
+async def shutdown():
+    # Let open event streams finish, then commit everything still queued before exiting
+    close_streams()
+    await asyncio.to_thread(log_writer.stop)
+    await payload_capture.stop()
+
 # --- Routes ---
 
 @app.get("/", response_class=HTMLResponse)
@@ -49,6 +194,9 @@ async def webhook(request: Request):
     """
     Endpoint to receive real call data from MacroDroid/Tasker.
     """
+    user_id = resolve_user(request)
+    if user_id is None:
+        return bad_user_response()
     try:
         # 1. READ RAW BODY
         try:
@@ -56,56 +204,23 @@ async def webhook(request: Request):
         except Exception:
             raw_body = (await request.body()).decode()
 
-        print(f"\n--- [DEBUG] INCOMING PAYLOAD ---\n{raw_body}\n--------------------------------")
-
-        # 2. LOG TO FILE (for inspection)
-        debug_file = "debug_payloads.json"
-        existing_logs = []
-        if os.path.exists(debug_file):
-            try:
-                with open(debug_file, "r") as f:
-                    existing_logs = json.load(f)
-            except: pass
-        
-        existing_logs.append({
-            "timestamp": datetime.datetime.now().isoformat(),
-            "payload": raw_body
-        })
-        
-        with open(debug_file, "w") as f:
-            json.dump(existing_logs, f, indent=2)
+        if config.DEBUG_PRINT_PAYLOADS:
+            print(f"\n--- [DEBUG] INCOMING PAYLOAD ---\n{raw_body}\n--------------------------------")
+
+        # 2. CAPTURE FOR INSPECTION (ring buffer, flushed in the background)
+        payload_capture.capture(raw_body)
 
         # 3. MANUAL VALIDATION / CASTING
-        # MacroDroid might send strings for everything. Let's be lenient.
-        if isinstance(raw_body, dict):
-            # Parse 'duration' safely
-            dur = raw_body.get('duration', 0)
-            if isinstance(dur, str) and dur.replace('.','',1).isdigit():
-                dur = int(float(dur)) # handle "45.0"
-            elif not isinstance(dur, (int, float)):
-                dur = 0
-            
-            # Handle name extraction robustly (empty or None -> "Unknown")
-            raw_name = raw_body.get('name')
-            if not raw_name or str(raw_name).strip() == "":
-                final_name = "Unknown"
-            else:
-                final_name = str(raw_name)
-
-            # Construct cleaned data
-            clean_data = {
-                "name": final_name,
-                "number": str(raw_body.get('number', '')),
-                "duration": int(dur),
-                "type": str(raw_body.get('type', 'INCOMING')).upper(),
-                "timestamp": raw_body.get('timestamp', datetime.datetime.now().isoformat())
-            }
-            
-            # Save Log
-            reader = CallLogReader()
-            reader.add_fresh_log(clean_data)
+        clean_data = clean_call_record(raw_body)
+        if clean_data is not None:
+            # Save Log (group-committed by the writer thread; returns once it is on disk)
+            reader = CallLogReader(user_id)
+            saved = await log_writer.write(reader.store, [clean_data])
+            if saved:
+                print(f"★ NEW REAL LOG SAVED: {clean_data['name']}")
+            message = "Log saved" if saved else "Duplicate ignored"
             
-            return {"status": "success", "message": "Log saved", "debug_payload": raw_body}
+            return {"status": "success", "message": message, "debug_payload": raw_body}
             
         return JSONResponse(status_code=400, content={"status": "error", "message": "Body must be JSON object"})
 
@@ -113,53 +228,152 @@ async def webhook(request: Request):
         print(f"Webhook Error: {e}")
         return JSONResponse(status_code=500, content={"status": "error", "message": str(e)})
 
+@app.post("/api/webhook/batch")
+async def webhook_batch(request: Request):
+    """
+    Bulk ingest for replays / exports: JSON array or NDJSON, one call record per item.
+    The whole batch is committed in one write; already stored calls are skipped.
+    """
+    user_id = resolve_user(request)
+    if user_id is None:
+        return bad_user_response()
+    try:
+        raw_text = (await request.body()).decode()
+        items = parse_batch_body(raw_text)
+
+        clean_records = []
+        rejected = 0
+        for item in items:
+            clean_data = clean_call_record(item)
+            if clean_data is None:
+                rejected += 1
+            else:
+                clean_records.append(clean_data)
+
+        reader = CallLogReader(user_id)
+        saved = await log_writer.write(reader.store, clean_records)
+        print(f"★ BATCH: {len(saved)} saved, {len(clean_records) - len(saved)} duplicates, {rejected} rejected")
+
+        return {
+            "status": "success",
+            "received": len(items),
+            "saved": len(saved),
+            "duplicates": len(clean_records) - len(saved),
+            "rejected": rejected
+        }
+
+    except Exception as e:
+        print(f"Batch Webhook Error: {e}")
+        return JSONResponse(status_code=500, content={"status": "error", "message": str(e)})
+
+MAX_WINDOW_DAYS = 3650
+MAX_TOP_CONTACTS = 50
+
+def window_param(request, name, default, limit=MAX_WINDOW_DAYS):
+    """Positive integer (day count, top-K) from the query string; raises ValueError on junk."""
+    value = request.query_params.get(name)
+    if value is None or value == "":
+        return default
+    days = int(value)
+    if not 1 <= days <= limit:
+        raise ValueError(f"{name} must be between 1 and {limit}")
+    return days
+
+def cached_body(user_id, key, build):
+    """(body, etag) for `key`: the cached one, or build(reader) serialized + cached."""
+    # Cached body is valid until the aggregates change (or the next day, when the windows move)
+    reader = CallLogReader(user_id)
+    analysis_cache = analysis_cache_for(reader)
+    version = analysis_view(reader).version
+    cached = analysis_cache.get(key, version)
+    if cached is None:
+        cached = analysis_cache.put(key, version, build(reader))
+    return cached
+
+async def cached_json_response(request, user_id, key, build):
+    """Serve a cached body (or build + cache it) with ETag / 304 handling."""
+    # The store open, first-touch replay and build all block, so they run off the loop
+    body, etag = await asyncio.to_thread(cached_body, user_id, key, build)
+
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers=headers)
+    return Response(content=body, media_type="application/json", headers=headers)
+
 @app.get("/api/analyze")
-async def analyze():
-    # 1. Generate & Read Logs
-    reader = CallLogReader()
-    reader.read_last_30_days_logs()
-    
-    # 2. Extract Features
-    extractor = FeatureExtractor(reader.get_logs())
-    extractor.extract_features()
-    
-    # 3. Baseline Comparison
-    comparator = BaselineComparator(reader.get_logs())
-    comparator.compare()
-    
-    # 4. Estimate Status
-    estimator = WellBeingEstimator(
-        comparator.get_anomalies(),
-        extractor.stats['most_contacted']
+async def analyze(request: Request):
+    """
+    Dashboard analysis. Optional ?recent=<days>&baseline=<days> pick the
+    comparison windows (default: last 7 days vs everything before);
+    ?top=<k> sets how many contacts `top_contacts` lists.
+    """
+    user_id = resolve_user(request)
+    if user_id is None:
+        return bad_user_response()
+    try:
+        recent = window_param(request, "recent", RECENT_DAYS)
+        baseline = window_param(request, "baseline", None)
+        top = window_param(request, "top", TOP_CONTACTS, MAX_TOP_CONTACTS)
+    except ValueError as e:
+        return JSONResponse(status_code=400, content={"status": "error", "message": str(e)})
+
+    key = ("analyze", datetime.date.today().isoformat(), recent, baseline, top)
+    return await cached_json_response(
+        request, user_id, key,
+        lambda reader: build_analysis(reader, recent, baseline, top)
     )
-    estimator.estimate()
-    
-    # helper for formatting date strings
-    def format_log(log):
-        return {
-            "name": log.name,
-            "type": log.call_type.value,
-            "duration": log.duration_sec,
-            "date": log.timestamp.strftime("%b %d, %H:%M")
+
+@app.get("/api/timeseries")
+async def timeseries(request: Request):
+    """
+    Call totals per day or week: ?from=YYYY-MM-DD&to=YYYY-MM-DD&bucket=day|week
+    (`to` inclusive; defaults to the last 30 days).
+    """
+    user_id = resolve_user(request)
+    if user_id is None:
+        return bad_user_response()
+    params = request.query_params
+    bucket = params.get("bucket", "day")
+    try:
+        end = parse_day(params.get("to"), datetime.date.today())
+        start = parse_day(params.get("from"), end - datetime.timedelta(days=29))
+    except ValueError:
+        return JSONResponse(status_code=400, content={"status": "error", "message": "Dates must be YYYY-MM-DD"})
+    if bucket not in ("day", "week") or start > end or (end - start).days >= MAX_WINDOW_DAYS:
+        return JSONResponse(status_code=400, content={"status": "error", "message": "Invalid range or bucket"})
+
+    key = ("timeseries", datetime.date.today().isoformat(), start.isoformat(), end.isoformat(), bucket)
+    return await cached_json_response(
+        request, user_id, key,
+        lambda reader: {
+            "from": start.isoformat(),
+            "to": end.isoformat(),
+            "bucket": bucket,
+            "series": analysis_view(reader).timeseries(start, end + datetime.timedelta(days=1), bucket)
         }
+    )
 
-    # Prepare JSON response
-    response = {
-        "status": estimator.status,
-        "reason": estimator.reason,
-        "suggestion": estimator.suggestion,
-        "metrics": {
-            "calls_per_day": extractor.stats['avg_calls_per_day'],
-            "avg_duration": extractor.stats['avg_duration_sec'],
-            "most_contacted": extractor.stats['most_contacted'][0],
-            "recent_count": extractor.stats['recent_7day_count'],
-        },
-        "time_distribution": extractor.stats['time_dist'],
-        "comparison": comparator.comparison_data,
-        "recent_logs": [format_log(log) for log in reader.get_logs()[:10]]
-    }
-    
-    return response
+@app.get("/api/stream")
+async def stream(request: Request):
+    """
+    Server-Sent Events: a full `analysis` snapshot on connect, then `logs`
+    (new calls) and `analysis` (changed keys only) after every committed write.
+    """
+    user_id = resolve_user(request)
+    if user_id is None:
+        return bad_user_response()
+    channel = await analysis_stream_for(user_id)
+    return StreamingResponse(
+        channel.events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+@app.post("/api/analyze/all")
+async def analyze_all():
+    """Bulk job: every user's analysis, computed across a process pool."""
+    results = await asyncio.to_thread(analyze_all_users, config.ANALYZE_ALL_WORKERS)
+    return {"status": "success", "users": len(results), "results": results}
 
 if __name__ == '__main__':
     # Run with uvicorn
@@ -0,0 +1,234 @@
+import argparse
+import asyncio
+import contextlib
+import io
+import json
+import os
+import platform
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime, timedelta
+
+import numpy as np
+
+import config
+
+# ==========================================
+# CALL MONITOR MICROBENCHMARKS
+# ==========================================
+# Generates call histories of a given size, stores them as one user's
+# partition, then times every stage of the analysis plus the /api/analyze
+# handler (called in-process, no HTTP). Peak memory of each stage is
+# measured in a separate tracemalloc run so it doesn't skew the timings.
+#
+#   python benchmark.py --sizes 1000,100000,1000000 --contacts 200
+#
+# Results go to benchmark_results/<time>-<commit>.json; compare files
+# from two commits to spot regressions.
+
+DEFAULT_SIZES = "1000,10000,100000,1000000"
+TYPES = np.array(["INCOMING", "OUTGOING", "MISSED"])
+TYPE_WEIGHTS = [0.5, 0.35, 0.15]
+# Calls cluster in the morning and evening, almost none at night
+HOUR_WEIGHTS = np.array([1, 1, 1, 1, 1, 2, 4, 6, 8, 9, 9, 9, 10, 9, 8, 8, 9, 10, 11, 11, 10, 7, 4, 2], dtype=float)
+
+
+def generate_history(path, entries, contacts, days, seed, chunk=100000):
+    """Writes `entries` calls as JSONL (the journal's format) over the last `days` days."""
+    rng = np.random.default_rng(seed)
+    # Zipf-like popularity: a few people get most of the calls
+    weights = 1.0 / np.arange(1, contacts + 1) ** 1.1
+    weights /= weights.sum()
+    hour_weights = HOUR_WEIGHTS / HOUR_WEIGHTS.sum()
+    start = np.datetime64(datetime.now().replace(microsecond=0) - timedelta(days=days), "s")
+
+    with open(path, "w", encoding="utf-8") as f:
+        for offset in range(0, entries, chunk):
+            n = min(chunk, entries - offset)
+            who = rng.choice(contacts, size=n, p=weights)
+            day = rng.integers(0, days, size=n)
+            hour = rng.choice(24, size=n, p=hour_weights)
+            second = day * 86400 + hour * 3600 + rng.integers(0, 3600, size=n)
+            stamps = np.datetime_as_string(start + second.astype("timedelta64[s]"), unit="s")
+            ctype = rng.choice(3, size=n, p=TYPE_WEIGHTS)
+            duration = np.where(ctype == 2, 0, rng.lognormal(4.5, 1.0, size=n).astype(np.int64))
+            lines = [
+                json.dumps({
+                    "name": f"Contact {w}",
+                    "number": f"+1555{w:07d}",
+                    "duration": int(d),
+                    "type": str(TYPES[t]),
+                    "timestamp": str(s)
+                }) + "\n"
+                for w, d, t, s in zip(who, duration, ctype, stamps)
+            ]
+            f.writelines(lines)
+
+
+class StageTimer:
+    """Runs each stage `repeat` times (best time wins) and once more under tracemalloc."""
+
+    def __init__(self, repeat, memory):
+        self.repeat = repeat
+        self.memory = memory
+        self.stages = {}
+
+    def run(self, name, fn, repeat=None, reset=None):
+        """`reset` (optional) restores the starting state before every run, traced one included."""
+        times = []
+        result = None
+        for _ in range(repeat or self.repeat):
+            if reset:
+                reset()
+            with contextlib.redirect_stdout(io.StringIO()):
+                start = time.perf_counter()
+                result = fn()
+                times.append(time.perf_counter() - start)
+        stage = {"seconds": min(times), "runs": len(times)}
+
+        if self.memory:
+            if reset:
+                reset()
+            tracemalloc.start()
+            try:
+                with contextlib.redirect_stdout(io.StringIO()):
+                    fn()
+                stage["peak_bytes"] = tracemalloc.get_traced_memory()[1]
+            finally:
+                tracemalloc.stop()
+
+        self.stages[name] = stage
+        print(f"  {name:<16} {stage['seconds'] * 1000:10.1f} ms"
+              + (f"  {stage['peak_bytes'] / 2**20:8.1f} MiB peak" if "peak_bytes" in stage else ""))
+        return result
+
+
+def bench_size(entries, args):
+    from call_monitor import CallLogReader, FeatureExtractor, BaselineComparator, WellBeingEstimator, partition_dir
+    from features import FeaturePipeline
+    from fastapi import Request
+    import analytics
+    import app
+
+    user = f"bench-{entries}-{args.contacts}"
+    # Written before the store is opened: the SQLite backend imports the
+    # JSONL through its one-shot migration when CallLogReader opens it
+    base = partition_dir(user)
+    os.makedirs(base, exist_ok=True)
+    generate_history(os.path.join(base, "real_call_logs.jsonl"), entries, args.contacts, args.days, args.seed)
+    with contextlib.redirect_stdout(io.StringIO()):
+        reader = CallLogReader(user)
+    print(f"{entries} calls, {args.contacts} contacts, {args.days} days")
+    timer = StageTimer(args.repeat, not args.no_memory)
+
+    # 1. CallLogReader: parse the last 30 days of the log into the columnar store
+    def load():
+        reader.read_last_30_days_logs()
+        return reader.get_logs()
+    logs = timer.run("read_logs", load)
+
+    # 2-4. The same steps call_monitor's run_demo runs. FeatureExtractor and
+    #      BaselineComparator only read the shared scan's output, so the scan
+    #      is the stage that scales with the log; they aren't timed apart.
+    results = timer.run("pipeline", lambda: FeaturePipeline().run(logs))
+    with contextlib.redirect_stdout(io.StringIO()):
+        extractor = FeatureExtractor(logs, results)
+        extractor.extract_features()
+        comparator = BaselineComparator(logs, results)
+        comparator.compare()
+
+    def estimate():
+        estimator = WellBeingEstimator(comparator.get_anomalies(), extractor.stats["most_contacted"])
+        estimator.estimate()
+    timer.run("estimate", estimate)
+
+    # 5. /api/analyze in-process: first call replays the log into the live
+    #    aggregates, later ones recompute from them or hit the response cache
+    scope = {
+        "type": "http", "method": "GET", "path": "/api/analyze",
+        "query_string": f"user={user}".encode(), "headers": []
+    }
+
+    def handler():
+        response = asyncio.run(app.analyze(Request(scope)))
+        assert response.status_code == 200, response.status_code
+
+    def forget():
+        # Drop the live aggregates and cached answers so the next call starts cold,
+        # and take the aggregates' write listener off the store so they don't pile up
+        live = analytics._live.pop(reader.store.path, None)
+        if live is not None:
+            reader.store.unsubscribe(live.add_records)
+        app.analysis_caches.pop(user, None)
+    timer.run("analyze_cold", handler, reset=forget)
+    cache = app.analysis_caches[user]
+    timer.run("analyze_recompute", lambda: (cache.invalidate(), handler()))
+    timer.run("analyze_cached", handler)
+
+    return {
+        "entries": entries,
+        "contacts": args.contacts,
+        "days": args.days,
+        "file_bytes": os.path.getsize(reader.REAL_LOGS_DB if config.CALL_LOG_BACKEND == "sqlite" else reader.REAL_LOGS_FILE),
+        "stages": timer.stages
+    }
+
+
+def git_commit():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except Exception:
+        return "unknown"
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Time and measure the call analytics stages.")
+    parser.add_argument("--sizes", default=DEFAULT_SIZES, help="Comma-separated history sizes (e.g. 1000,...,10000000)")
+    parser.add_argument("--contacts", type=int, default=50, help="Number of distinct contacts")
+    parser.add_argument("--days", type=int, default=90, help="Days of history to spread calls over")
+    parser.add_argument("--repeat", type=int, default=3, help="Timed runs per stage (best is kept)")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--no-memory", action="store_true", help="Skip the tracemalloc peak-memory runs")
+    parser.add_argument("--output", help="Result file (default: benchmark_results/<time>-<commit>.json)")
+    args = parser.parse_args(argv)
+
+    sizes = [int(s) for s in args.sizes.split(",") if s.strip()]
+    commit = git_commit()
+
+    # Benchmark data lives in a throwaway partition folder, real logs stay untouched
+    config.PARTITIONS_DIR = tempfile.mkdtemp(prefix="call_bench_")
+    config.SYNTHETIC_PADDING = "off"
+    config.DEBUG_PRINT_PAYLOADS = False
+
+    try:
+        results = [bench_size(n, args) for n in sizes]
+    finally:
+        shutil.rmtree(config.PARTITIONS_DIR, ignore_errors=True)
+
+    report = {
+        "commit": commit,
+        "created": datetime.now().isoformat(timespec="seconds"),
+        "python": sys.version.split()[0],
+        "numpy": np.__version__,
+        "platform": platform.platform(),
+        "backend": config.CALL_LOG_BACKEND,
+        "results": results
+    }
+
+    output = args.output
+    if not output:
+        os.makedirs("benchmark_results", exist_ok=True)
+        output = os.path.join("benchmark_results", f"{datetime.now():%Y%m%d-%H%M%S}-{commit}.json")
+    with open(output, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+    print(f"Results written to {output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,7 +1,16 @@
+import hashlib
+import json
+import os
 import random
-from datetime import datetime, timedelta
-import enum
 import time
+from datetime import datetime, timedelta
+
+import config
+from features import FeaturePipeline
+from journal import open_journal
+from log_store import ColumnarCallLog
+from models import CallType, CallLogEntry, parse_log_record
+from sqlite_store import open_sqlite_store
 
 # ==========================================
 # HACKATHON PROTOTYPE: MENTAL WELL BEING MONITOR
@@ -10,116 +19,185 @@ import time
 # ====================
 # DATA MODELS
 # ====================
-
-class CallType(enum.Enum):
-    INCOMING = "INCOMING"
-    OUTGOING = "OUTGOING"
-    MISSED = "MISSED"
-
-class CallLogEntry:
-    def __init__(self, name, number, timestamp, duration_sec, call_type):
-        self.name = name
-        self.number = number
-        self.timestamp = timestamp
-        self.duration_sec = duration_sec
-        self.call_type = call_type
-
-    def __repr__(self):
-        # Format: [Date Time] Type | Name (Duration)
-        time_str = self.timestamp.strftime('%Y-%m-%d %H:%M')
-        return f"[{time_str}] {self.call_type.value.ljust(8)} | {self.name} ({self.duration_sec}s)"
+# (Live in models.py so the storage modules can share them)
 
 # ====================
 # 1. CALL LOG READER
 # ====================
 
-class CallLogReader:
-    def __init__(self):
-        self.logs = []
+# Today's synthetic baseline per user: (user_id, date) -> ColumnarCallLog
+_synthetic_cache = {}
 
-import json
-import os
+DEFAULT_USER = "default"
+HISTORY_DAYS = 30  # Days read by read_last_30_days_logs (same span as the synthetic history)
+
+def partition_dir(user_id):
+    """Where a user's logs live. The default user keeps the original top-level files."""
+    if user_id == DEFAULT_USER:
+        return ""
+    return os.path.join(config.PARTITIONS_DIR, user_id)
 
-# ... (Enums and CallLogEntry remain same) ...
+def list_users():
+    """Every user with a partition (the default user always counts)."""
+    users = [DEFAULT_USER]
+    if os.path.isdir(config.PARTITIONS_DIR):
+        users.extend(sorted(
+            name for name in os.listdir(config.PARTITIONS_DIR)
+            if os.path.isdir(os.path.join(config.PARTITIONS_DIR, name))
+        ))
+    return users
 
 class CallLogReader:
-    def __init__(self):
-        self.logs = []
-        self.REAL_LOGS_FILE = "real_call_logs.json"
+    def __init__(self, user_id=DEFAULT_USER):
+        self.user_id = user_id
+        self.logs = ColumnarCallLog()
+        base = partition_dir(user_id)
+        if base:
+            os.makedirs(base, exist_ok=True)
+        self.REAL_LOGS_FILE = os.path.join(base, "real_call_logs.jsonl")
+        self.LEGACY_LOGS_FILE = os.path.join(base, "real_call_logs.json")  # Old pretty-printed array, migrated once
+        self.REAL_LOGS_DB = os.path.join(base, "real_call_logs.db")
+        self.store = self._open_store()
+
+    def _open_store(self):
+        """Journal (default) or SQLite, per config.CALL_LOG_BACKEND. Both share one interface."""
+        if config.CALL_LOG_BACKEND == "sqlite":
+            return open_sqlite_store(self.REAL_LOGS_DB, migrate_from=(self.LEGACY_LOGS_FILE, self.REAL_LOGS_FILE))
+        return open_journal(self.REAL_LOGS_FILE, legacy_path=self.LEGACY_LOGS_FILE)
 
     def read_last_30_days_logs(self):
         """
         Reads logs. 
         STRATEGY: 
-        1. Generate synthetic 30-day history (so the Dashboard isn't empty).
+        1. Use the synthetic 30-day history (so the Dashboard isn't empty),
+           unless there is already enough real history.
         2. Load REAL logs received via Webhook and overlay them.
         """
-        self.logs = []
+        self.logs = ColumnarCallLog()
+        # Only the window is loaded (an index range scan on the SQLite backend)
+        since = (datetime.now() - timedelta(days=HISTORY_DAYS)).replace(hour=0, minute=0, second=0, microsecond=0)
+        real_logs = self._load_real_logs(since)
         
-        # 1. Generate Synthetic History (Baseline)
-        self._generate_synthetic_history()
+        # 1. Synthetic History (Baseline)
+        if self.use_synthetic_padding(real_logs.distinct_days() if real_logs else 0):
+            self.logs.extend(self.synthetic_history())
 
-        # 2. Load Real Logs (if any)
-        real_logs = self._load_real_logs()
+        # 2. Real Logs (if any)
         if real_logs:
             print(f"Merged {len(real_logs)} REAL logs from device.")
             self.logs.extend(real_logs)
             
         # Sort desc
-        self.logs.sort(key=lambda x: x.timestamp, reverse=True)
+        self.logs.sort_desc()
+
+    def use_synthetic_padding(self, real_days):
+        """config.SYNTHETIC_PADDING: on / off / auto (until enough real days exist)."""
+        if config.SYNTHETIC_PADDING == "off":
+            return False
+        if config.SYNTHETIC_PADDING == "on":
+            return True
+        return real_days < config.SYNTHETIC_MIN_REAL_DAYS
+
+    def synthetic_history(self):
+        """
+        Today's synthetic baseline for this user. Same seed all day, so every
+        refresh sees the same baseline. Memory cache -> disk cache -> generate.
+        The returned store is shared: copy it (extend) rather than modifying it.
+        """
+        today = datetime.now().date()
+        key = (self.user_id, today)
+        logs = _synthetic_cache.get(key)
+        if logs is not None:
+            return logs
+
+        logs = self._load_synthetic_cache(today)
+        if logs is None:
+            logs = self._generate_synthetic_history(today)
+            self._save_synthetic_cache(today, logs)
+
+        # Keep only today's baseline per user
+        for old_key in [k for k in _synthetic_cache if k[0] == self.user_id]:
+            del _synthetic_cache[old_key]
+        _synthetic_cache[key] = logs
+        return logs
 
     def add_fresh_log(self, data):
-        """Receives a single log dict from Webhook/API and saves it."""
+        """Receives a single log dict from Webhook/API and appends it to the log store."""
         # data format: {'name': 'X', 'number': 'Y', 'duration': 123, 'type': 'INCOMING', 'timestamp': 'ISO_STR'}
-        
-        existing_data = []
-        if os.path.exists(self.REAL_LOGS_FILE):
-             with open(self.REAL_LOGS_FILE, 'r') as f:
-                try: 
-                    existing_data = json.load(f)
-                except: pass
-        
-        existing_data.append(data)
-        
-        with open(self.REAL_LOGS_FILE, 'w') as f:
-            json.dump(existing_data, f, indent=2)
-            
-        print(f"★ NEW REAL LOG SAVED: {data.get('name')}")
+        saved = self.add_fresh_logs([data])
+        if saved:
+            print(f"★ NEW REAL LOG SAVED: {data.get('name')}")
+        else:
+            print(f"Duplicate log ignored: {data.get('name')}")
+        return bool(saved)
 
-    def _load_real_logs(self):
-        if not os.path.exists(self.REAL_LOGS_FILE):
-            return []
-            
-        logs = []
-        with open(self.REAL_LOGS_FILE, 'r') as f:
+    def add_fresh_logs(self, records):
+        """
+        Commits many log dicts in one store write.
+        Retries of an already stored call (same number, timestamp, type) are dropped.
+        Returns the records that were actually saved.
+        """
+        return self.store.append_unique(records)
+
+    def _load_real_logs(self, since=None):
+        # Streamed straight into columns; no per-call objects are kept
+        logs = ColumnarCallLog()
+        for item in self.store.iter_records(since):
             try:
-                raw_list = json.load(f)
-                for item in raw_list:
-                    # Parse Timestamp
-                    try:
-                        ts = datetime.fromisoformat(item['timestamp'])
-                    except:
-                        ts = datetime.now() # Fallback
-                    
-                    # Parse Type
-                    ctype = CallType.INCOMING
-                    if 'OUT' in item['type'].upper(): ctype = CallType.OUTGOING
-                    if 'MISS' in item['type'].upper(): ctype = CallType.MISSED
-                    
-                    entry = CallLogEntry(
-                        item['name'], 
-                        item.get('number', ''), 
-                        ts, 
-                        int(item.get('duration', 0)), 
-                        ctype
-                    )
-                    logs.append(entry)
+                logs.append(parse_log_record(item))
             except Exception as e:
-                print(f"Error loading real logs: {e}")
+                print(f"Error loading real log {item}: {e}")
         return logs
 
-    def _generate_synthetic_history(self):
+    def _synthetic_cache_path(self):
+        safe_id = "".join(c if c.isalnum() or c in "-_" else "_" for c in self.user_id)
+        return os.path.join(config.SYNTHETIC_CACHE_DIR, f"{safe_id}.json")
+
+    def _load_synthetic_cache(self, day):
+        path = self._synthetic_cache_path()
+        if not os.path.exists(path):
+            return None
+        try:
+            with open(path, "r") as f:
+                cached = json.load(f)
+            if cached.get("date") != day.isoformat():
+                return None
+            logs = ColumnarCallLog()
+            for item in cached["logs"]:
+                logs.append(parse_log_record(item))
+            return logs
+        except Exception as e:
+            print(f"Ignoring unreadable synthetic cache {path}: {e}")
+            return None
+
+    def _save_synthetic_cache(self, day, logs):
+        path = self._synthetic_cache_path()
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            cached = {
+                "user": self.user_id,
+                "date": day.isoformat(),
+                "logs": [{
+                    "name": log.name,
+                    "number": log.number,
+                    "duration": log.duration_sec,
+                    "type": log.call_type.value,
+                    "timestamp": log.timestamp.isoformat()
+                } for log in logs]
+            }
+            tmp_path = path + ".tmp"
+            with open(tmp_path, "w") as f:
+                json.dump(cached, f)
+            os.replace(tmp_path, path)
+        except Exception as e:
+            print(f"Could not save synthetic cache {path}: {e}")
+
+    def _generate_synthetic_history(self, day):
         print("Generating synthetic baseline history...")
+        # Stable seed per user per day -> same baseline on every refresh and restart
+        seed = int(hashlib.sha256(f"{self.user_id}:{day.isoformat()}".encode()).hexdigest()[:16], 16)
+        rng = random.Random(seed)
+
         # Synthetic contacts
         contacts = [
             ("Mom", "+919876543210"),
@@ -128,30 +206,30 @@ class CallLogReader:
             ("Pizza Place", "+919876543213")
         ]
         
-        end_date = datetime.now()
-        start_date = end_date - timedelta(days=30)
+        logs = ColumnarCallLog()
+        end_date = datetime.combine(day, datetime.min.time())
+        current_date = end_date - timedelta(days=30)
         
-        current_date = start_date
-        while current_date <= end_date:
-            # Skip today for synthetic data so REAL data shines today
-            if current_date.date() == datetime.today().date():
-                break
-
-            num_calls = random.choice([0, 1, 2, 3, 5])
+        # Skip today for synthetic data so REAL data shines today
+        while current_date < end_date:
+            num_calls = rng.choice([0, 1, 2, 3, 5])
             for _ in range(num_calls):
-                contact_name, contact_number = random.choice(contacts)
-                hour = random.randint(9, 21)
-                minute = random.randint(0, 59)
+                contact_name, contact_number = rng.choice(contacts)
+                hour = rng.randint(9, 21)
+                minute = rng.randint(0, 59)
                 call_time = current_date.replace(hour=hour, minute=minute)
-                call_type = random.choice([CallType.INCOMING, CallType.INCOMING, CallType.OUTGOING])
-                duration = int(random.expovariate(1/300))
+                call_type = rng.choice([CallType.INCOMING, CallType.INCOMING, CallType.OUTGOING])
+                duration = int(rng.expovariate(1/300))
                 if duration == 0: duration = 15
                 
                 entry = CallLogEntry(contact_name, contact_number, call_time, duration, call_type)
-                self.logs.append(entry)
+                logs.append(entry)
             
             current_date += timedelta(days=1)
 
+        logs.sort_desc()
+        return logs
+
     def get_logs(self):
         return self.logs
 
@@ -165,8 +243,9 @@ class CallLogReader:
 # ====================
 
 class FeatureExtractor:
-    def __init__(self, logs):
+    def __init__(self, logs, results=None):
         self.logs = logs
+        self.results = results  # Optional FeaturePipeline output shared with BaselineComparator
         self.stats = {}
 
     def extract_features(self):
@@ -175,60 +254,35 @@ class FeatureExtractor:
             print("No logs to process.")
             return
 
+        # One fused scan (skipped when the caller already ran the pipeline)
+        if self.results is None:
+            self.results = FeaturePipeline().run(self.logs)
+        windows = self.results["windows"]
+        everything = windows["all"]
+
         # 1. Calls per day (Total calls / Total days covered)
         # We assume logs cover roughly 30 days based on generation
-        total_calls = len(self.logs)
-        dates = set(log.timestamp.date() for log in self.logs)
-        num_days = len(dates) if dates else 1
-        avg_calls_per_day = round(total_calls / num_days, 1)
+        avg_calls_per_day = round(everything["count"] / (everything["days"] or 1), 1)
 
         # 2. Average call duration (only for accepted calls)
-        valid_calls = [log for log in self.logs if log.call_type != CallType.MISSED]
-        total_duration = sum(log.duration_sec for log in valid_calls)
-        avg_duration_sec = int(total_duration / len(valid_calls)) if valid_calls else 0
-
-        # 3. Most contacted person (Frequency)
-        contact_counts = {}
-        for log in self.logs:
-            contact_counts[log.name] = contact_counts.get(log.name, 0) + 1
-        
-        # Sort by count desc
-        most_contacted = sorted(contact_counts.items(), key=lambda x: x[1], reverse=True)
-        top_contact_name = most_contacted[0][0] if most_contacted else "N/A"
-        top_contact_count = most_contacted[0][1] if most_contacted else 0
-
-        # 4. Recent activity (Last 7 days vs Previous)
-        # This will be useful for baseline comparison later, but let's just get the count for now
-        now = datetime.now()
-        seven_days_ago = now - timedelta(days=7)
-        recent_logs = [log for log in self.logs if log.timestamp >= seven_days_ago]
-        recent_call_count = len(recent_logs)
-
-        # 5. Time of Day Distribution
-        morning_calls = 0 # 6 AM - 12 PM
-        afternoon_calls = 0 # 12 PM - 6 PM
-        evening_night_calls = 0 # 6 PM - 6 AM
-
-        for log in self.logs:
-            hour = log.timestamp.hour
-            if 6 <= hour < 12:
-                morning_calls += 1
-            elif 12 <= hour < 18:
-                afternoon_calls += 1
-            else:
-                evening_night_calls += 1
+        valid_count = everything["valid"]
+        avg_duration_sec = int(everything["duration"] / valid_count) if valid_count else 0
 
         self.stats = {
             "avg_calls_per_day": avg_calls_per_day,
             "avg_duration_sec": avg_duration_sec,
-            "most_contacted": (top_contact_name, top_contact_count),
-            "recent_7day_count": recent_call_count,
-            "time_dist": {
-                "Morning": morning_calls,
-                "Afternoon": afternoon_calls,
-                "Night": evening_night_calls
-            }
+            # 3. Most contacted person (Frequency)
+            "most_contacted": self.results["most_contacted"],
+            # 4. Recent activity (Last 7 days)
+            "recent_7day_count": windows["recent"]["count"],
+            # 5. Time of Day Distribution
+            "time_dist": self.results["time_dist"]
         }
+
+        # Extra pluggable features are reported under their own name
+        for name, value in self.results.items():
+            if name not in ("windows", "most_contacted", "time_dist"):
+                self.stats[name] = value
         
     def show_stats(self):
         print("\n--- EXTRACTED FEATURES ---")
@@ -248,8 +302,9 @@ class FeatureExtractor:
 # ====================
 
 class BaselineComparator:
-    def __init__(self, logs):
+    def __init__(self, logs, results=None):
         self.logs = logs
+        self.results = results  # Optional FeaturePipeline output shared with FeatureExtractor
         self.anomalies = []
         self.comparison_data = {}
 
@@ -257,37 +312,34 @@ class BaselineComparator:
         print("\nComparing recent activity vs baseline...")
         if not self.logs: return
 
-        # Split data: Recent (Last 7 days) vs Baseline (Everything before)
-        now = datetime.now()
-        seven_days_ago = now - timedelta(days=7)
-        
-        recent_logs = [log for log in self.logs if log.timestamp >= seven_days_ago]
-        baseline_logs = [log for log in self.logs if log.timestamp < seven_days_ago]
+        # Split data: Recent (Last 7 days) vs Baseline (Everything before),
+        # already done by the fused scan
+        if self.results is None:
+            self.results = FeaturePipeline().run(self.logs)
+        recent = self.results["windows"]["recent"]
+        baseline = self.results["windows"]["baseline"]
         
-        if not baseline_logs:
+        if not baseline["count"]:
             print("Not enough data for baseline.")
             return
 
         # Helper to get daily average
-        def get_daily_avg(log_list):
-            if not log_list: return 0
-            dates = set(log.timestamp.date() for log in log_list)
-            num_days = len(dates) if dates else 1
-            return len(log_list) / num_days
+        def get_daily_avg(window):
+            if not window["count"]: return 0
+            return window["count"] / (window["days"] or 1)
 
         # Helper to get avg duration
-        def get_avg_duration(log_list):
-            valid = [l for l in log_list if l.call_type != CallType.MISSED]
-            if not valid: return 0
-            return sum(l.duration_sec for l in valid) / len(valid)
+        def get_avg_duration(window):
+            if not window["valid"]: return 0
+            return window["duration"] / window["valid"]
 
         # 1. Frequency Comparison
-        baseline_daily_freq = get_daily_avg(baseline_logs)
-        recent_daily_freq = get_daily_avg(recent_logs)
+        baseline_daily_freq = get_daily_avg(baseline)
+        recent_daily_freq = get_daily_avg(recent)
         
         # 2. Duration Comparison
-        baseline_avg_dur = get_avg_duration(baseline_logs)
-        recent_avg_dur = get_avg_duration(recent_logs)
+        baseline_avg_dur = get_avg_duration(baseline)
+        recent_avg_dur = get_avg_duration(recent)
 
         self.comparison_data = {
             "baseline_freq": round(baseline_daily_freq, 1),
@@ -296,18 +348,28 @@ class BaselineComparator:
             "recent_dur": int(recent_avg_dur)
         }
 
-        # Detect Anomalies (Simple Rules)
+        self.anomalies.extend(self.detect_anomalies(
+            baseline_daily_freq, recent_daily_freq,
+            baseline_avg_dur, recent_avg_dur,
+            recent["count"]
+        ))
+
+    @staticmethod
+    def detect_anomalies(baseline_freq, recent_freq, baseline_dur, recent_dur, recent_count):
+        """Simple rules shared by every way of computing the comparison."""
+        anomalies = []
         # Rule 1: Significant drop in calls (e.g., < 50% of baseline)
-        if recent_daily_freq < (baseline_daily_freq * 0.5):
-            self.anomalies.append("Significant drop in call frequency")
+        if recent_freq < (baseline_freq * 0.5):
+            anomalies.append("Significant drop in call frequency")
         
         # Rule 2: Shorter conversations (e.g., < 60% of usual duration)
-        if recent_avg_dur < (baseline_avg_dur * 0.6):
-            self.anomalies.append("Calls are much shorter than usual")
+        if recent_dur < (baseline_dur * 0.6):
+            anomalies.append("Calls are much shorter than usual")
             
         # Rule 3: No activity at all
-        if not recent_logs:
-            self.anomalies.append("No calls in the last 7 days")
+        if not recent_count:
+            anomalies.append("No calls in the last 7 days")
+        return anomalies
 
     def show_comparison(self):
         print("\n--- BASELINE COMPARISON ---")
@@ -371,18 +433,50 @@ class WellBeingEstimator:
 # MAIN EXECUTION
 # ====================
 
-if __name__ == "__main__":
+# ====================
+# 6. EXPORT ANALYSIS (CLI)
+# ====================
+
+def analyze_exports(paths, jobs=1, now=None):
+    """
+    Streams exported call logs (CSV / JSON array / NDJSON, gzip or not)
+    through the incremental aggregates and returns the finished estimator.
+    Memory stays flat however big the files are; with jobs > 1 the files
+    are processed in parallel and their aggregates combined at the end.
+    """
+    from concurrent.futures import ProcessPoolExecutor
+    from analytics import AnalyticsView
+    from exports import summarize_export
+
+    if jobs > 1 and len(paths) > 1:
+        with ProcessPoolExecutor(max_workers=jobs) as pool:
+            summaries = list(pool.map(summarize_export, paths))
+    else:
+        summaries = [summarize_export(path) for path in paths]
+
+    parts = []
+    for path, (analytics, counts) in zip(paths, summaries):
+        print(f"{path}: {counts['rows']} calls" + (f", {counts['bad']} bad rows skipped" if counts["bad"] else ""))
+        parts.append(analytics)
+
+    stats, comparison, anomalies = AnalyticsView(parts, now).compute()
+    estimator = WellBeingEstimator(anomalies, stats['most_contacted'])
+    estimator.estimate()
+    return estimator
+
+def run_demo():
     # 1. Initialize and Read Logs
     reader = CallLogReader()
     reader.read_last_30_days_logs()
     
-    # 2. Extract Features
-    extractor = FeatureExtractor(reader.get_logs())
+    # 2. Extract Features (one fused scan, shared with step 3)
+    results = FeaturePipeline().run(reader.get_logs())
+    extractor = FeatureExtractor(reader.get_logs(), results)
     extractor.extract_features()
     # extractor.show_stats() # Hiding intermediate debug stats for cleaner demo
 
     # 3. Compare with Baseline
-    comparator = BaselineComparator(reader.get_logs())
+    comparator = BaselineComparator(reader.get_logs(), results)
     comparator.compare()
     # comparator.show_comparison() # Hiding intermediate debug output
 
@@ -395,3 +489,18 @@ if __name__ == "__main__":
     
     # 6. Final Output
     estimator.show_dashboard()
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Mental well-being monitor based on call logs.")
+    parser.add_argument("exports", nargs="*", help="Exported call logs (.csv / .json / .ndjson, optionally .gz). None = demo data.")
+    parser.add_argument("-j", "--jobs", type=int, default=1, help="Process this many files in parallel")
+    parser.add_argument("--as-of", help="Reference date YYYY-MM-DD for the recent window (default: now)")
+    args = parser.parse_args()
+
+    if args.exports:
+        now = datetime.fromisoformat(args.as_of).replace(hour=23, minute=59) if args.as_of else None
+        analyze_exports(args.exports, args.jobs, now).show_dashboard()
+    else:
+        run_demo()
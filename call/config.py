@@ -0,0 +1,35 @@
+import os
+
+# ==========================================
+# CALL MONITOR SETTINGS
+# ==========================================
+# Everything can be overridden with environment variables so the same
+# code runs on a laptop demo and on a production box.
+
+def _flag(name, default):
+    return os.getenv(name, default).strip().lower() in ("1", "true", "yes", "on")
+
+# --- Debug payload capture (/api/webhook) ---
+# Keeps the newest raw webhook bodies for inspecting MacroDroid/Tasker output.
+# Set DEBUG_CAPTURE_ENABLED=0 in production to switch it off completely.
+DEBUG_CAPTURE_ENABLED = _flag("DEBUG_CAPTURE_ENABLED", "1")
+DEBUG_CAPTURE_FILE = os.getenv("DEBUG_CAPTURE_FILE", "debug_payloads.json")
+DEBUG_CAPTURE_SIZE = int(os.getenv("DEBUG_CAPTURE_SIZE", "200"))  # Ring buffer: newest N payloads
+DEBUG_CAPTURE_SAMPLE_RATE = float(os.getenv("DEBUG_CAPTURE_SAMPLE_RATE", "1.0"))  # 0.0 - 1.0
+DEBUG_CAPTURE_FLUSH_SEC = float(os.getenv("DEBUG_CAPTURE_FLUSH_SEC", "2.0"))  # Min gap between disk writes
+DEBUG_PRINT_PAYLOADS = _flag("DEBUG_PRINT_PAYLOADS", "1" if DEBUG_CAPTURE_ENABLED else "0")
+
+# --- Synthetic baseline padding ---
+# "on": always pad with synthetic history, "off": never,
+# "auto": pad until the real log covers SYNTHETIC_MIN_REAL_DAYS distinct days.
+SYNTHETIC_PADDING = os.getenv("SYNTHETIC_PADDING", "auto").strip().lower()
+SYNTHETIC_MIN_REAL_DAYS = int(os.getenv("SYNTHETIC_MIN_REAL_DAYS", "14"))
+SYNTHETIC_CACHE_DIR = os.getenv("SYNTHETIC_CACHE_DIR", "synthetic_cache")  # One JSON file per user
+
+# --- Call log storage ---
+# "jsonl": append-only journal (default). "sqlite": WAL-mode database with
+# time / number indexes; imports the flat files once on first start.
+CALL_LOG_BACKEND = os.getenv("CALL_LOG_BACKEND", "jsonl").strip().lower()
+PARTITIONS_DIR = os.getenv("PARTITIONS_DIR", "partitions")  # One sub-folder of logs per user / device token
+ANALYZE_ALL_WORKERS = int(os.getenv("ANALYZE_ALL_WORKERS", "0")) or None  # None = one per CPU
+LOG_WRITER_MAX_WAIT_SEC = float(os.getenv("LOG_WRITER_MAX_WAIT_SEC", "0.005"))  # Group-commit window
@@ -0,0 +1,72 @@
+from datetime import date, timedelta
+
+import numpy as np
+
+# ==========================================
+# DAILY BUCKET INDEX
+# ==========================================
+# Prefix sums over one row per calendar day (first logged day .. last).
+# Any window of days is two lookups per column, a day/week time series is
+# one slice per bucket. Built from the per-day aggregates, so a rebuild
+# costs O(days), never O(calls).
+
+COLUMNS = ("count", "valid", "duration", "missed", "active")
+
+
+class DayIndex:
+    def __init__(self, buckets):
+        """`buckets`: {date: DayBucket-like} (count / valid / duration / missed)."""
+        self.first = min(buckets) if buckets else None
+        self.last = max(buckets) if buckets else None
+        n = (self.last - self.first).days + 1 if buckets else 0
+
+        daily = {col: np.zeros(n, dtype=np.int64) for col in COLUMNS}
+        for day, b in buckets.items():
+            i = (day - self.first).days
+            daily["count"][i] += b.count
+            daily["valid"][i] += b.valid
+            daily["duration"][i] += b.duration
+            daily["missed"][i] += b.missed
+        daily["active"] = (daily["count"] > 0).astype(np.int64)
+
+        # prefix[col][i] = sum of the first i days
+        self.prefix = {
+            col: np.concatenate(([0], np.cumsum(values)))
+            for col, values in daily.items()
+        }
+        self.size = n
+
+    def _pos(self, day):
+        """Row boundary for `day`, clamped to the indexed range."""
+        if self.first is None:
+            return 0
+        return min(max((day - self.first).days, 0), self.size)
+
+    def window(self, start=None, end=None):
+        """Totals for start <= day < end (None = open-ended). O(1)."""
+        lo = 0 if start is None else self._pos(start)
+        hi = self.size if end is None else self._pos(end)
+        hi = max(hi, lo)
+        totals = {col: int(self.prefix[col][hi] - self.prefix[col][lo]) for col in COLUMNS}
+        totals["days"] = totals.pop("active")
+        return totals
+
+    def series(self, start, end, bucket="day"):
+        """One totals dict per day (or Monday-aligned week) overlapping start <= day < end."""
+        step = 7 if bucket == "week" else 1
+        cursor = start - timedelta(days=start.weekday()) if bucket == "week" else start
+        points = []
+        while cursor < end:
+            nxt = cursor + timedelta(days=step)
+            point = self.window(max(cursor, start), min(nxt, end))
+            point["date"] = cursor.isoformat()
+            points.append(point)
+            cursor = nxt
+        return points
+
+
+def parse_day(value, default=None):
+    """YYYY-MM-DD query value -> date (raises ValueError on junk)."""
+    if not value:
+        return default
+    return date.fromisoformat(value)
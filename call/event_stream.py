@@ -0,0 +1,148 @@
+import asyncio
+import json
+import signal
+import threading
+
+# ==========================================
+# SERVER-SENT EVENTS
+# ==========================================
+# One AnalysisStream per user. It listens to the user's log store; when a
+# write commits (on the writer thread) it hops onto the event loop,
+# recomputes the analysis once (in a worker thread, so the loop keeps
+# serving) and fans out to every connected client:
+#
+#   event: logs      -> the newly saved calls
+#   event: analysis  -> only the top-level analysis keys that changed
+#
+# Idle clients are a parked coroutine plus a heartbeat comment every
+# HEARTBEAT_SEC. A client that falls CLIENT_QUEUE_SIZE events behind has
+# its backlog dropped and gets one full snapshot instead.
+#
+# Only _publish moves `last` (the baseline deltas are taken against); a
+# client's own snapshot never does, so a client connecting between a commit
+# and its _publish can't swallow that update for everyone else.
+#
+# Uvicorn waits for open responses to finish before it runs shutdown hooks,
+# and a stream never finishes by itself, so streams are closed as soon as
+# the exit signal arrives (close_on_exit_signal).
+
+HEARTBEAT_SEC = 15
+CLIENT_QUEUE_SIZE = 64
+RETRY_MS = 2000  # EventSource reconnect delay
+
+_CLOSE = ("close", None)
+_RESYNC = ("resync", None)
+
+
+def format_event(event, data, event_id=None):
+    lines = []
+    if event_id is not None:
+        lines.append(f"id: {event_id}")
+    lines.append(f"event: {event}")
+    lines.append("data: " + json.dumps(data, separators=(",", ":")))
+    return "\n".join(lines) + "\n\n"
+
+
+class AnalysisStream:
+    def __init__(self, loop, build, format_records):
+        """
+        build(): full analysis dict for this user (runs in a worker thread).
+        format_records(records): new raw log dicts -> what the `logs` event carries.
+        """
+        self.loop = loop
+        self.build = build
+        self.format_records = format_records
+        self.clients = set()  # asyncio.Queue per connection
+        self.event_id = 0
+        self.last = None  # Last analysis published, deltas are taken against it
+        self.closed = False
+        self._publishing = asyncio.Lock()  # One recompute at a time, in commit order
+
+    # --- Store side (writer thread) ---
+
+    def on_write(self, records):
+        if self.clients:
+            asyncio.run_coroutine_threadsafe(self._publish(list(records)), self.loop)
+
+    # --- Loop side ---
+
+    async def _publish(self, records):
+        async with self._publishing:
+            if not self.clients:
+                return
+            analysis = await asyncio.to_thread(self.build)
+            last = self.last or {}
+            delta = {key: value for key, value in analysis.items() if last.get(key) != value}
+            self.last = analysis
+
+            self.event_id += 1
+            self._send(("logs", self.format_records(records)))
+            if delta:
+                self._send(("analysis", delta))
+
+    def _send(self, item):
+        for queue in list(self.clients):
+            try:
+                queue.put_nowait(item)
+            except asyncio.QueueFull:
+                # Too far behind: forget the backlog, send a fresh snapshot instead
+                while not queue.empty():
+                    queue.get_nowait()
+                queue.put_nowait(_RESYNC)
+
+    async def snapshot(self):
+        """Full analysis for one client. Doesn't touch the published baseline."""
+        analysis = await asyncio.to_thread(self.build)
+        return format_event("analysis", analysis, self.event_id)
+
+    async def events(self):
+        """Async generator of SSE text for one client, until it disconnects."""
+        if self.closed:
+            return
+        queue = asyncio.Queue(CLIENT_QUEUE_SIZE)
+        self.clients.add(queue)
+        try:
+            yield f"retry: {RETRY_MS}\n\n"
+            yield await self.snapshot()
+            while True:
+                try:
+                    event, data = await asyncio.wait_for(queue.get(), HEARTBEAT_SEC)
+                except asyncio.TimeoutError:
+                    yield ": ping\n\n"
+                    continue
+                if event == "close":
+                    break
+                if event == "resync":
+                    yield await self.snapshot()
+                else:
+                    yield format_event(event, data, self.event_id)
+        finally:
+            self.clients.discard(queue)
+
+    def close(self):
+        """Ends every open stream (server shutdown). Runs on the loop thread."""
+        self.closed = True
+        for queue in list(self.clients):
+            while not queue.empty():
+                queue.get_nowait()
+            queue.put_nowait(_CLOSE)
+
+
+def close_on_exit_signal(close):
+    """
+    Puts close() (run on the current loop) in front of the installed
+    SIGINT / SIGTERM handlers. Call it from a startup hook, once uvicorn's
+    own handlers are in place; they still run right after.
+    """
+    if threading.current_thread() is not threading.main_thread():
+        return
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        previous = signal.getsignal(sig)
+        if not callable(previous):
+            continue  # Not under a server that handles the signal itself
+
+        def handler(signum, frame, previous=previous):
+            loop.call_soon_threadsafe(close)
+            previous(signum, frame)
+        signal.signal(sig, handler)
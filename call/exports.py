@@ -0,0 +1,206 @@
+import csv
+import gzip
+import json
+
+from analytics import CallAnalytics
+from models import parse_log_record
+
+# ==========================================
+# STREAMING EXPORT READER
+# ==========================================
+# Generators over exported call logs: CSV (with a header row), a JSON
+# array, or NDJSON, each optionally gzip-compressed. The format is
+# sniffed from the content, not the file name. Records are yielded one at
+# a time, so memory does not depend on the file size. An element or line
+# that doesn't decode comes out as None, and iter_entries counts it as bad
+# instead of aborting the whole file.
+
+READ_CHUNK = 1 << 16
+BATCH_SIZE = 10000  # Entries handed to the aggregates at a time
+GZIP_MAGIC = b"\x1f\x8b"
+MAX_ELEMENT_CHARS = 1 << 20  # A JSON array element still undecodable at this size is skipped
+
+# CSV header aliases -> the field names parse_log_record expects.
+# Separate "date" and "time" columns are joined into the timestamp.
+CSV_FIELDS = {
+    "contact": "name", "contact_name": "name",
+    "phone": "number", "phone_number": "number",
+    "call_type": "type", "direction": "type",
+    "datetime": "timestamp",
+    "duration_sec": "duration", "seconds": "duration"
+}
+
+
+def open_export(path):
+    """Text handle for a plain or gzip-compressed export."""
+    with open(path, "rb") as f:
+        compressed = f.read(2) == GZIP_MAGIC
+    if compressed:
+        return gzip.open(path, "rt", encoding="utf-8", errors="replace", newline="")
+    return open(path, "r", encoding="utf-8", errors="replace", newline="")
+
+
+def _first_char(f):
+    """Peeks the first non-blank character (the handle is rewound)."""
+    while True:
+        chunk = f.read(256)
+        if not chunk:
+            f.seek(0)
+            return ""
+        stripped = chunk.lstrip("\ufeff \t\r\n")
+        if stripped:
+            f.seek(0)
+            return stripped[0]
+
+
+def iter_json_array(f):
+    """
+    Objects of a top-level JSON array, decoded incrementally. A malformed
+    (or oversized / truncated) element is skipped to the next top-level ","
+    and yielded as None.
+    """
+    decoder = json.JSONDecoder()
+    buf = f.read(READ_CHUNK).lstrip("\ufeff \t\r\n")
+    if not buf.startswith("["):
+        raise ValueError("Not a JSON array")
+    pos = 1
+    eof = False
+    while True:
+        # Skip separators
+        while pos < len(buf) and buf[pos] in " \t\r\n,":
+            pos += 1
+        if pos < len(buf) and buf[pos] == "]":
+            return
+        if pos >= len(buf):
+            if eof:
+                return
+            buf, pos = buf[pos:] + f.read(READ_CHUNK), 0
+            eof = len(buf) == 0
+            continue
+        try:
+            item, end = decoder.raw_decode(buf, pos)
+        except ValueError:
+            # Maybe just cut off by the chunk: read on, up to the size cap
+            more = f.read(READ_CHUNK) if len(buf) - pos < MAX_ELEMENT_CHARS else ""
+            if more:
+                buf, pos = buf[pos:] + more, 0
+                continue
+            buf, pos = _skip_element(f, buf, pos)
+            yield None
+            continue
+        yield item
+        pos = end
+        if pos > READ_CHUNK:
+            buf, pos = buf[pos:], 0
+
+
+def _skip_element(f, buf, pos):
+    """
+    Scans past a bad array element to the next "," or "]" outside strings and
+    nesting, reading on as needed and dropping what was scanned.
+    Returns (buf, pos) at that separator, or an empty buffer at end of file.
+    """
+    depth = 0
+    in_string = escaped = False
+    while True:
+        while pos < len(buf):
+            c = buf[pos]
+            if in_string:
+                if escaped:
+                    escaped = False
+                elif c == "\\":
+                    escaped = True
+                elif c == '"':
+                    in_string = False
+            elif c == '"':
+                in_string = True
+            elif c in "[{":
+                depth += 1
+            elif c in "]}":
+                if depth == 0:
+                    return buf, pos  # End of the array
+                depth -= 1
+            elif c == "," and depth == 0:
+                return buf, pos
+            pos += 1
+        buf, pos = f.read(READ_CHUNK), 0
+        if not buf:
+            return buf, pos
+
+
+def iter_ndjson(f):
+    """One value per line; a line that doesn't parse is yielded as None."""
+    for line in f:
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            yield json.loads(line)
+        except ValueError:
+            yield None
+
+
+def iter_csv(f):
+    reader = csv.DictReader(f)
+    for row in reader:
+        record = {
+            CSV_FIELDS.get(key, key): value
+            for key, value in ((k.strip("\ufeff \t").lower(), v) for k, v in row.items() if k)
+        }
+        if not record.get("timestamp"):
+            # "date" + "time" columns, or either one alone holding the full timestamp
+            date = (record.pop("date", None) or "").strip()
+            time = (record.pop("time", None) or "").strip()
+            record["timestamp"] = f"{date} {time}".strip()
+        yield record
+
+
+def iter_export(path):
+    """Raw record dicts from one export file, whatever its format."""
+    with open_export(path) as f:
+        head = _first_char(f)
+        if head == "[":
+            yield from iter_json_array(f)
+        elif head == "{":
+            yield from iter_ndjson(f)
+        else:
+            yield from iter_csv(f)
+
+
+def iter_entries(records, counts):
+    """Records -> CallLogEntry; bad ones are counted in counts["bad"] and skipped."""
+    for record in records:
+        try:
+            if not isinstance(record, dict):
+                raise ValueError("not an object")
+            record.setdefault("type", "INCOMING")
+            entry = parse_log_record(record, strict=True)  # No "called just now" for bad dates
+        except Exception:
+            counts["bad"] += 1
+            continue
+        counts["rows"] += 1
+        yield entry
+
+
+def batched(items, size):
+    batch = []
+    for item in items:
+        batch.append(item)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def summarize_export(path):
+    """
+    One file -> (CallAnalytics, {"rows", "bad"}). Only the aggregates are
+    kept, so this runs in constant memory (plus one entry per contact / day).
+    Top-level so process pools can run it.
+    """
+    counts = {"rows": 0, "bad": 0}
+    analytics = CallAnalytics()
+    for batch in batched(iter_entries(iter_export(path), counts), BATCH_SIZE):
+        analytics.add_entries(batch)
+    return analytics, counts
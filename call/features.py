@@ -0,0 +1,170 @@
+from datetime import datetime, time, timedelta
+
+import numpy as np
+
+from log_store import ColumnarCallLog, MISSED, SECONDS_PER_DAY, to_epoch
+
+# ==========================================
+# FUSED FEATURE PIPELINE
+# ==========================================
+# One scan over the call log feeds every feature. The log is walked in
+# column chunks; the arrays all features need (day number, hour, answered
+# mask, recent mask) are derived once per chunk and handed to each
+# feature's update(). FeatureExtractor and BaselineComparator both read
+# their numbers from the same run.
+#
+# Adding a metric = subclass Feature, then pass it in `extra_features`
+# (or add it to DEFAULT_FEATURES). No new pass over the data.
+
+RECENT_DAYS = 7  # Recent window: today and the 6 calendar days before it (shared with analytics.py)
+CHUNK_SIZE = 1 << 18  # Rows per chunk; bounds the temporary arrays
+
+
+def recent_window_start(now, recent_days=RECENT_DAYS):
+    """First calendar day of the recent window. Calls dated later (clock skew) count as recent too."""
+    return now.date() - timedelta(days=recent_days - 1)
+
+
+class CallBatch:
+    """One chunk of columns plus the derived arrays every feature shares."""
+
+    def __init__(self, store, start, stop, recent_from):
+        self.names = store.names
+        self.ts = store.ts[start:stop]
+        self.duration = store.duration[start:stop]
+        self.ctype = store.ctype[start:stop]
+        self.name_id = store.name_id[start:stop]
+        self.day = self.ts // SECONDS_PER_DAY
+        self.hour = (self.ts % SECONDS_PER_DAY) // 3600
+        self.valid = self.ctype != MISSED
+        self.recent = self.ts >= recent_from
+
+    def __len__(self):
+        return len(self.ts)
+
+
+class Feature:
+    """Base class: accumulate per chunk in update(), report in result()."""
+    name = None
+
+    def update(self, batch):
+        raise NotImplementedError
+
+    def result(self):
+        raise NotImplementedError
+
+
+def empty_window():
+    return {"count": 0, "days": set(), "valid": 0, "duration": 0}
+
+
+def merge_windows(a, b):
+    """Adds two raw window summaries (active days are a set union)."""
+    return {
+        "count": a["count"] + b["count"],
+        "days": a["days"] | b["days"],
+        "valid": a["valid"] + b["valid"],
+        "duration": a["duration"] + b["duration"]
+    }
+
+
+def finalize_windows(recent, baseline):
+    """Raw recent / baseline summaries -> the `windows` result (day sets become counts)."""
+    windows = {"recent": recent, "baseline": baseline, "all": merge_windows(recent, baseline)}
+    return {
+        key: {
+            "count": w["count"],
+            "days": len(w["days"]),
+            "valid": w["valid"],
+            "duration": w["duration"]
+        }
+        for key, w in windows.items()
+    }
+
+
+class WindowStats(Feature):
+    """Counts, active days and answered-call durations for all / recent / baseline."""
+    name = "windows"
+
+    def __init__(self):
+        self.windows = {"recent": empty_window(), "baseline": empty_window()}
+
+    def update(self, batch):
+        for key, mask in (("recent", batch.recent), ("baseline", ~batch.recent)):
+            w = self.windows[key]
+            w["count"] += int(mask.sum())
+            w["days"].update(np.unique(batch.day[mask]).tolist())
+            answered = mask & batch.valid
+            w["valid"] += int(answered.sum())
+            w["duration"] += int(batch.duration[answered].sum(dtype=np.int64))
+
+    def result(self):
+        return finalize_windows(self.windows["recent"], self.windows["baseline"])
+
+
+class TopContact(Feature):
+    """Most contacted name (by number of calls)."""
+    name = "most_contacted"
+
+    def __init__(self):
+        self.counts = np.zeros(0, dtype=np.int64)
+        self.names = []
+
+    def update(self, batch):
+        self.names = batch.names
+        counts = np.bincount(batch.name_id, minlength=len(batch.names))
+        if len(counts) > len(self.counts):
+            counts[:len(self.counts)] += self.counts
+            self.counts = counts
+        else:
+            self.counts[:len(counts)] += counts
+
+    def result(self):
+        if not self.counts.any():
+            return ("N/A", 0)
+        top = int(self.counts.argmax())
+        return (self.names[top], int(self.counts[top]))
+
+
+class TimeOfDay(Feature):
+    """Morning 6-12, Afternoon 12-18, Night 18-6."""
+    name = "time_dist"
+
+    def __init__(self):
+        self.dist = {"Morning": 0, "Afternoon": 0, "Night": 0}
+
+    def update(self, batch):
+        morning = int(((batch.hour >= 6) & (batch.hour < 12)).sum())
+        afternoon = int(((batch.hour >= 12) & (batch.hour < 18)).sum())
+        self.dist["Morning"] += morning
+        self.dist["Afternoon"] += afternoon
+        self.dist["Night"] += len(batch) - morning - afternoon
+
+    def result(self):
+        return dict(self.dist)
+
+
+DEFAULT_FEATURES = [WindowStats, TopContact, TimeOfDay]
+
+
+class FeaturePipeline:
+    def __init__(self, extra_features=(), now=None, chunk_size=CHUNK_SIZE):
+        self.features = [cls() for cls in DEFAULT_FEATURES] + list(extra_features)
+        self.now = now or datetime.now()
+        self.chunk_size = chunk_size
+
+    def run(self, logs):
+        """Single scan; returns {feature.name: feature.result()}."""
+        store = ColumnarCallLog.from_entries(logs)
+        recent_from = to_epoch(datetime.combine(recent_window_start(self.now), time()))
+        for start in range(0, len(store), self.chunk_size):
+            batch = CallBatch(store, start, min(start + self.chunk_size, len(store)), recent_from)
+            for feature in self.features:
+                feature.update(batch)
+        return {feature.name: feature.result() for feature in self.features}
+
+    def feature(self, name):
+        for feature in self.features:
+            if feature.name == name:
+                return feature
+        raise KeyError(name)
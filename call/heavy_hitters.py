@@ -0,0 +1,99 @@
+import heapq
+
+# ==========================================
+# HEAVY-HITTER SKETCH (SPACE-SAVING)
+# ==========================================
+# Keeps at most `capacity` counters. A new name arriving when all counters
+# are taken replaces the smallest one and inherits its count (recorded as
+# `error`). Any name called more than total/capacity times is guaranteed
+# to be kept, and with no more distinct names than `capacity` the counts
+# are exact. Sketches can be merged, so day sketches add up to window
+# sketches and live + synthetic logs combine without touching raw calls.
+
+DEFAULT_CAPACITY = 256
+
+
+class SpaceSaving:
+    __slots__ = ("capacity", "counts", "errors", "total", "_heap")
+
+    def __init__(self, capacity=DEFAULT_CAPACITY):
+        self.capacity = capacity
+        self.counts = {}  # name -> count (an over-estimate by at most errors[name])
+        self.errors = {}
+        self.total = 0
+        self._heap = []  # (count, name) once per tracked name; refreshed lazily
+
+    def add(self, name, count=1):
+        self.total += count
+        if name in self.counts:
+            self.counts[name] += count
+            return
+        if len(self.counts) < self.capacity:
+            self.counts[name] = count
+            self.errors[name] = 0
+            heapq.heappush(self._heap, (count, name))
+            return
+
+        # Full: evict the smallest counter. Heap entries may be stale (counts
+        # only grow), so re-push until the top one is current.
+        while True:
+            low, victim = self._heap[0]
+            current = self.counts[victim]
+            if current == low:
+                break
+            heapq.heapreplace(self._heap, (current, victim))
+        heapq.heapreplace(self._heap, (low + count, name))
+        del self.counts[victim], self.errors[victim]
+        self.counts[name] = low + count
+        self.errors[name] = low
+
+    def floor(self):
+        """Upper bound on the count of any name not being tracked."""
+        if len(self.counts) < self.capacity:
+            return 0
+        return min(self.counts.values())
+
+    def top(self, k):
+        """[(name, count)], biggest first; ties by name."""
+        return heapq.nsmallest(k, self.counts.items(), key=lambda item: (-item[1], item[0]))
+
+    def merged(self, *others):
+        """A new sketch over the union of streams (this one and `others`)."""
+        sketches = [s for s in (self,) + others if s.counts]
+        result = SpaceSaving(max([self.capacity] + [s.capacity for s in others]))
+        if not sketches:
+            return result
+        if len(sketches) == 1:
+            result.counts = dict(sketches[0].counts)
+            result.errors = dict(sketches[0].errors)
+        else:
+            # A name untracked by a full sketch may still have been seen up to
+            # that sketch's floor times: add the floors of the sketches missing it
+            floors = [s.floor() for s in sketches]
+            total_floor = sum(floors)
+            counts, errors, covered = result.counts, result.errors, {}
+            for s, low in zip(sketches, floors):
+                for name, count in s.counts.items():
+                    counts[name] = counts.get(name, 0) + count
+                    errors[name] = errors.get(name, 0) + s.errors[name]
+                    covered[name] = covered.get(name, 0) + low
+            if total_floor:
+                for name in counts:
+                    missing = total_floor - covered[name]
+                    counts[name] += missing
+                    errors[name] += missing
+            if len(result.counts) > result.capacity:
+                keep = result.top(result.capacity)
+                result.counts = dict(keep)
+                result.errors = {name: result.errors[name] for name, _ in keep}
+        result.total = sum(s.total for s in sketches)
+        result._heap = [(count, name) for name, count in result.counts.items()]
+        heapq.heapify(result._heap)
+        return result
+
+
+def merge_sketches(sketches, capacity=DEFAULT_CAPACITY):
+    sketches = list(sketches)
+    if not sketches:
+        return SpaceSaving(capacity)
+    return sketches[0].merged(*sketches[1:])
@@ -0,0 +1,269 @@
+import hashlib
+import json
+import os
+import threading
+
+from log_store import to_epoch
+from models import parse_log_record
+
+# ==========================================
+# APPEND-ONLY CALL LOG JOURNAL
+# ==========================================
+# One JSON record per line. Appends are O(1) (no read / rewrite of the
+# whole file) and the loader streams line by line. A torn last line is cut
+# off before the next append; only if a read finds unreadable lines in the
+# middle of the file does a background compaction rewrite it without them.
+
+
+def record_key(record):
+    """Content hash of (number, timestamp, type) - identifies a retried call."""
+    raw = "\x1f".join((
+        str(record.get("number", "")).strip(),
+        str(record.get("timestamp", "")).strip(),
+        str(record.get("type", "")).strip().upper()
+    ))
+    return hashlib.blake2b(raw.encode("utf-8"), digest_size=16).digest()
+
+
+def _before(record, bound):
+    """True if the record's call is older than `bound` (epoch seconds). Bad records are kept for the caller."""
+    try:
+        return to_epoch(parse_log_record(record, strict=True).timestamp) < bound
+    except Exception:
+        return False
+
+
+class CallLogJournal:
+    def __init__(self, path, legacy_path=None):
+        self.path = path
+        self.legacy_path = legacy_path
+        self._lock = threading.Lock()
+        self._tail_checked = False
+        self._unreadable = 0  # Unreadable lines the last full read found
+        self._compacting = False
+        self._keys = None  # Dedupe index, built on first append_unique
+        self._listeners = []  # Called with each batch of written records
+        self._migrate_legacy()
+
+    def subscribe(self, listener, replay=False):
+        """
+        Registers listener(records), called after every write while the lock
+        is held. With replay=True it is first fed everything already on disk,
+        so the listener sees each record exactly once.
+        """
+        with self._lock:
+            if replay:
+                batch = []
+                for record in self.iter_records():
+                    batch.append(record)
+                    if len(batch) >= 1000:
+                        listener(batch)
+                        batch = []
+                if batch:
+                    listener(batch)
+            self._listeners.append(listener)
+
+    def unsubscribe(self, listener):
+        with self._lock:
+            if listener in self._listeners:
+                self._listeners.remove(listener)
+
+    # --- Writing ---
+
+    def append(self, record):
+        self.append_many([record])
+
+    def append_unique(self, records, durable=False):
+        """
+        Appends only records whose (number, timestamp, type) hasn't been seen,
+        in one write (fsynced if durable). Returns the records that were actually written.
+        """
+        with self._lock:
+            if self._keys is None:
+                self._keys = set(record_key(r) for r in self.iter_records())
+            fresh = []
+            for r in records:
+                key = record_key(r)
+                if key in self._keys:
+                    continue
+                self._keys.add(key)
+                fresh.append(r)
+            self._write(fresh, durable)
+        return fresh
+
+    def append_many(self, records, durable=False):
+        """Appends records as one write. Never reads the existing file."""
+        with self._lock:
+            if self._keys is not None:
+                self._keys.update(record_key(r) for r in records)
+            self._write(records, durable)
+
+    def _write(self, records, durable=False):
+        # Caller holds self._lock
+        if not records:
+            return
+        payload = "".join(json.dumps(r, separators=(",", ":")) + "\n" for r in records)
+
+        if not self._tail_checked:
+            self._repair_tail()
+            self._tail_checked = True
+        with open(self.path, "a", encoding="utf-8") as f:
+            f.write(payload)
+            f.flush()
+            if durable:
+                os.fsync(f.fileno())
+        for listener in self._listeners:
+            try:
+                listener(records)
+            except Exception as e:
+                print(f"Journal listener failed: {e}")
+        if self._unreadable and not self._compacting:
+            self._compacting = True
+            self._unreadable = 0
+            threading.Thread(target=self._compact_in_background, daemon=True).start()
+
+    def _repair_tail(self):
+        """
+        A crash mid-append leaves a partial last line. Cut it off so the
+        next record doesn't get glued onto the garbage.
+        """
+        if not os.path.exists(self.path):
+            return
+        with open(self.path, "rb+") as f:
+            f.seek(0, os.SEEK_END)
+            size = f.tell()
+            if size == 0:
+                return
+            f.seek(size - 1)
+            if f.read(1) == b"\n":
+                return
+
+            # Walk back to the last complete line
+            pos = size
+            while pos > 0:
+                step = min(4096, pos)
+                pos -= step
+                f.seek(pos)
+                chunk = f.read(step)
+                idx = chunk.rfind(b"\n")
+                if idx != -1:
+                    pos += idx + 1
+                    break
+            print(f"Journal: dropping torn tail ({size - pos} bytes) in {self.path}")
+            f.truncate(pos)
+
+    # --- Reading ---
+
+    def iter_records(self, since=None):
+        """
+        Streams records one at a time. Unparseable lines (torn writes) are skipped.
+        With `since` (a datetime) only records at/after it are returned; the file
+        has no index, so this still reads every line.
+        """
+        bound = to_epoch(since) if since is not None else None
+        if not os.path.exists(self.path):
+            return
+        skipped = 0
+        with open(self.path, "r", encoding="utf-8", errors="replace") as f:
+            for line in f:
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    skipped += 1
+                    continue
+                if not isinstance(record, dict):
+                    continue
+                if bound is not None and _before(record, bound):
+                    continue
+                yield record
+        if skipped:
+            print(f"Journal: skipped {skipped} unreadable line(s) in {self.path}")
+        self._unreadable = skipped  # The next append compacts them away
+
+    # --- Maintenance ---
+
+    def compact(self):
+        """
+        Rewrites the journal with only valid records, then atomically swaps it in.
+        Appends that land while the copy is running are carried over at the end.
+        """
+        if not os.path.exists(self.path):
+            return
+        tmp_path = self.path + ".compact"
+
+        with self._lock:
+            cutoff = os.path.getsize(self.path)
+
+        # 1. Copy valid lines up to the cutoff without holding the lock
+        with open(self.path, "rb") as src, open(tmp_path, "wb") as dst:
+            copied = 0
+            for raw in src:
+                if copied + len(raw) > cutoff:
+                    break
+                copied += len(raw)
+                line = raw.strip()
+                if not line:
+                    continue
+                try:
+                    json.loads(line)
+                except ValueError:
+                    continue
+                dst.write(line + b"\n")
+
+            # 2. Carry over anything appended meanwhile, then swap
+            with self._lock:
+                src.seek(copied)
+                dst.write(src.read())
+                dst.flush()
+                os.fsync(dst.fileno())
+                os.replace(tmp_path, self.path)
+
+    def _compact_in_background(self):
+        try:
+            self.compact()
+        except Exception as e:
+            print(f"Journal compaction failed: {e}")
+        finally:
+            self._compacting = False
+
+    def _migrate_legacy(self):
+        """One-shot conversion of the old pretty-printed JSON array file."""
+        if not self.legacy_path or not os.path.exists(self.legacy_path):
+            return
+        if os.path.exists(self.path):
+            return
+        try:
+            with open(self.legacy_path, "r") as f:
+                records = json.load(f)
+        except Exception as e:
+            print(f"Journal: could not migrate {self.legacy_path}: {e}")
+            return
+
+        tmp_path = self.path + ".migrate"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            for r in records:
+                f.write(json.dumps(r, separators=(",", ":")) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.path)
+        os.replace(self.legacy_path, self.legacy_path + ".migrated")
+        print(f"Journal: migrated {len(records)} logs from {self.legacy_path}")
+
+
+# One journal per file per process, so appends from concurrent requests
+# share the same lock and dedupe index.
+_journals = {}
+_journals_lock = threading.Lock()
+
+
+def open_journal(path, legacy_path=None):
+    key = os.path.abspath(path)
+    with _journals_lock:
+        journal = _journals.get(key)
+        if journal is None:
+            journal = CallLogJournal(path, legacy_path)
+            _journals[key] = journal
+        return journal
@@ -0,0 +1,193 @@
+from datetime import datetime, timedelta
+
+import numpy as np
+
+from models import CallType, CallLogEntry
+
+# ==========================================
+# COLUMNAR CALL LOG STORE
+# ==========================================
+# Calls are held as typed NumPy columns instead of one Python object per
+# call (~21 bytes per call vs several hundred). Names and numbers are
+# dictionary-encoded. Existing code still sees a sequence of
+# CallLogEntry-like rows; those are built lazily on access.
+#
+# Timestamps are stored as "wall clock" epoch seconds: the naive local
+# time read as if it were UTC. That keeps `ts // 86400` equal to the local
+# calendar day and `ts % 86400` equal to the local time of day.
+
+EPOCH = datetime(1970, 1, 1)
+SECONDS_PER_DAY = 86400
+
+TYPE_CODES = {CallType.INCOMING: 0, CallType.OUTGOING: 1, CallType.MISSED: 2}
+CODE_TYPES = {code: ctype for ctype, code in TYPE_CODES.items()}
+MISSED = TYPE_CODES[CallType.MISSED]
+
+
+def to_epoch(dt):
+    if dt.tzinfo is not None:
+        dt = dt.replace(tzinfo=None)  # Keep the wall clock, like the rest of the app
+    return int((dt - EPOCH).total_seconds())
+
+
+def from_epoch(seconds):
+    return EPOCH + timedelta(seconds=int(seconds))
+
+
+class CallLogRow(CallLogEntry):
+    """Read-only view of one row; fields are decoded on access."""
+    __slots__ = ("_store", "_i")
+
+    def __init__(self, store, i):
+        self._store = store
+        self._i = i
+
+    @property
+    def name(self):
+        return self._store.names[self._store.name_id[self._i]]
+
+    @property
+    def number(self):
+        return self._store.numbers[self._store.number_id[self._i]]
+
+    @property
+    def timestamp(self):
+        return from_epoch(self._store.ts[self._i])
+
+    @property
+    def duration_sec(self):
+        return int(self._store.duration[self._i])
+
+    @property
+    def call_type(self):
+        return CODE_TYPES[int(self._store.ctype[self._i])]
+
+
+class ColumnarCallLog:
+    def __init__(self, capacity=256):
+        self.size = 0
+        self._ts = np.empty(capacity, dtype=np.int64)
+        self._duration = np.empty(capacity, dtype=np.int32)
+        self._ctype = np.empty(capacity, dtype=np.int8)
+        self._name_id = np.empty(capacity, dtype=np.int32)
+        self._number_id = np.empty(capacity, dtype=np.int32)
+        self.names = []
+        self.numbers = []
+        self._name_ids = {}
+        self._number_ids = {}
+
+    @classmethod
+    def from_entries(cls, entries):
+        if isinstance(entries, ColumnarCallLog):
+            return entries
+        store = cls(max(len(entries), 1))
+        store.extend(entries)
+        return store
+
+    # --- Columns (trimmed to the filled part) ---
+
+    @property
+    def ts(self):
+        return self._ts[:self.size]
+
+    @property
+    def duration(self):
+        return self._duration[:self.size]
+
+    @property
+    def ctype(self):
+        return self._ctype[:self.size]
+
+    @property
+    def name_id(self):
+        return self._name_id[:self.size]
+
+    @property
+    def number_id(self):
+        return self._number_id[:self.size]
+
+    # --- Writing ---
+
+    def _encode(self, value, ids, values):
+        code = ids.get(value)
+        if code is None:
+            code = ids[value] = len(values)
+            values.append(value)
+        return code
+
+    def _reserve(self, extra):
+        needed = self.size + extra
+        capacity = len(self._ts)
+        if needed <= capacity:
+            return
+        while capacity < needed:
+            capacity *= 2
+        for attr in ("_ts", "_duration", "_ctype", "_name_id", "_number_id"):
+            old = getattr(self, attr)
+            new = np.empty(capacity, dtype=old.dtype)
+            new[:self.size] = old[:self.size]
+            setattr(self, attr, new)
+
+    def append(self, entry):
+        self._reserve(1)
+        i = self.size
+        self._ts[i] = to_epoch(entry.timestamp)
+        self._duration[i] = entry.duration_sec
+        self._ctype[i] = TYPE_CODES[entry.call_type]
+        self._name_id[i] = self._encode(entry.name, self._name_ids, self.names)
+        self._number_id[i] = self._encode(entry.number, self._number_ids, self.numbers)
+        self.size += 1
+
+    def extend(self, entries):
+        if isinstance(entries, ColumnarCallLog):
+            self._extend_columns(entries)
+            return
+        self._reserve(len(entries))
+        for entry in entries:
+            self.append(entry)
+
+    def _extend_columns(self, other):
+        # Re-map the other store's dictionary codes into ours
+        name_map = np.array([self._encode(v, self._name_ids, self.names) for v in other.names], dtype=np.int32)
+        number_map = np.array([self._encode(v, self._number_ids, self.numbers) for v in other.numbers], dtype=np.int32)
+        n = other.size
+        self._reserve(n)
+        end = self.size + n
+        self._ts[self.size:end] = other.ts
+        self._duration[self.size:end] = other.duration
+        self._ctype[self.size:end] = other.ctype
+        if n:
+            self._name_id[self.size:end] = name_map[other.name_id]
+            self._number_id[self.size:end] = number_map[other.number_id]
+        self.size = end
+
+    def sort_desc(self):
+        """Newest first, like the old list.sort(key=timestamp, reverse=True)."""
+        order = np.argsort(-self.ts, kind="stable")
+        for attr in ("_ts", "_duration", "_ctype", "_name_id", "_number_id"):
+            col = getattr(self, attr)
+            col[:self.size] = col[:self.size][order]
+
+    # --- Sequence of rows ---
+
+    def __len__(self):
+        return self.size
+
+    def __iter__(self):
+        for i in range(self.size):
+            yield CallLogRow(self, i)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [CallLogRow(self, i) for i in range(*index.indices(self.size))]
+        if index < 0:
+            index += self.size
+        if not 0 <= index < self.size:
+            raise IndexError("call log index out of range")
+        return CallLogRow(self, index)
+
+    # --- Vectorized helpers ---
+
+    def distinct_days(self, mask=None):
+        ts = self.ts if mask is None else self.ts[mask]
+        return int(np.unique(ts // SECONDS_PER_DAY).size)
@@ -0,0 +1,122 @@
+import asyncio
+import queue
+import threading
+import time
+from concurrent.futures import Future
+
+# ==========================================
+# GROUP-COMMIT LOG WRITER
+# ==========================================
+# Webhook handlers hand their cleaned records to one writer thread and
+# await a future instead of touching the disk on the event loop. The
+# thread collects whatever arrives within `max_wait` seconds and commits
+# it as one durable write (one fsync) per log store, then resolves every
+# waiting request with the records that were actually saved.
+# A request that was cancelled while queued (client went away) is dropped
+# from its batch; a failing commit fails only that batch's requests.
+
+_STOP = object()
+
+
+class _Pending:
+    __slots__ = ("store", "records", "future")
+
+    def __init__(self, store, records):
+        self.store = store
+        self.records = records
+        self.future = Future()
+
+
+class GroupCommitWriter:
+    def __init__(self, max_wait=0.005, max_batch=1000):
+        self.max_wait = max_wait
+        self.max_batch = max_batch
+        self._queue = queue.Queue()
+        self._thread = None
+        self._closed = False
+        self._start_lock = threading.Lock()
+
+    def start(self):
+        with self._start_lock:
+            self._closed = False
+            self._start_thread()
+
+    def _start_thread(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="log-writer", daemon=True)
+            self._thread.start()
+
+    def submit(self, store, records):
+        """Queues records for `store`; the Future resolves to the saved (non-duplicate) ones."""
+        pending = _Pending(store, list(records))
+        # Same lock as stop(), so nothing can be queued behind _STOP
+        with self._start_lock:
+            if self._closed:
+                raise RuntimeError("Log writer is shut down")
+            self._start_thread()
+            self._queue.put(pending)
+        return pending.future
+
+    async def write(self, store, records):
+        """Awaitable submit: returns once the batch holding these records is on disk."""
+        return await asyncio.wrap_future(self.submit(store, records))
+
+    def stop(self, timeout=10):
+        """Stops accepting work, commits everything already queued, then joins."""
+        with self._start_lock:
+            self._closed = True
+            thread, self._thread = self._thread, None
+            if thread is None:
+                return
+            self._queue.put(_STOP)
+        thread.join(timeout)
+
+    # --- Writer thread ---
+
+    def _run(self):
+        stopping = False
+        while not stopping:
+            item = self._queue.get()
+            if item is _STOP:
+                break
+            batch = [item]
+            deadline = time.monotonic() + self.max_wait
+            while len(batch) < self.max_batch:
+                timeout = deadline - time.monotonic()
+                if timeout <= 0:
+                    break
+                try:
+                    item = self._queue.get(timeout=timeout)
+                except queue.Empty:
+                    break
+                if item is _STOP:
+                    stopping = True
+                    break
+                batch.append(item)
+            try:
+                self._commit(batch)
+            except Exception as e:
+                print(f"Log writer: batch failed: {e}")
+                for pending in batch:
+                    if not pending.future.done():
+                        pending.future.set_exception(e)
+
+    def _commit(self, batch):
+        by_store = {}
+        for pending in batch:
+            # False if the waiting request was cancelled; otherwise it can't be any more
+            if pending.future.set_running_or_notify_cancel():
+                by_store.setdefault(id(pending.store), []).append(pending)
+
+        for group in by_store.values():
+            store = group[0].store
+            records = [r for pending in group for r in pending.records]
+            try:
+                saved = store.append_unique(records, durable=True)
+            except Exception as e:
+                for pending in group:
+                    pending.future.set_exception(e)
+                continue
+            saved_ids = set(id(r) for r in saved)
+            for pending in group:
+                pending.future.set_result([r for r in pending.records if id(r) in saved_ids])
@@ -0,0 +1,50 @@
+from datetime import datetime
+import enum
+
+# ====================
+# DATA MODELS
+# ====================
+
+class CallType(enum.Enum):
+    INCOMING = "INCOMING"
+    OUTGOING = "OUTGOING"
+    MISSED = "MISSED"
+
+class CallLogEntry:
+    def __init__(self, name, number, timestamp, duration_sec, call_type):
+        self.name = name
+        self.number = number
+        self.timestamp = timestamp
+        self.duration_sec = duration_sec
+        self.call_type = call_type
+
+    def __repr__(self):
+        # Format: [Date Time] Type | Name (Duration)
+        time_str = self.timestamp.strftime('%Y-%m-%d %H:%M')
+        return f"[{time_str}] {self.call_type.value.ljust(8)} | {self.name} ({self.duration_sec}s)"
+
+def parse_log_record(item, strict=False):
+    """
+    Builds a CallLogEntry from a stored/webhook log dict.
+    strict=True raises on a missing / unparseable timestamp instead of using now.
+    """
+    # Parse Timestamp
+    try:
+        ts = datetime.fromisoformat(item['timestamp'])
+    except:
+        if strict:
+            raise ValueError(f"bad timestamp: {item.get('timestamp')!r}")
+        ts = datetime.now() # Fallback
+    
+    # Parse Type
+    ctype = CallType.INCOMING
+    if 'OUT' in item['type'].upper(): ctype = CallType.OUTGOING
+    if 'MISS' in item['type'].upper(): ctype = CallType.MISSED
+    
+    return CallLogEntry(
+        item['name'], 
+        item.get('number', ''), 
+        ts, 
+        int(item.get('duration', 0)), 
+        ctype
+    )
@@ -0,0 +1,86 @@
+import asyncio
+import datetime
+import json
+import os
+import random
+from collections import deque
+
+# ==========================================
+# DEBUG PAYLOAD CAPTURE
+# ==========================================
+# Raw webhook bodies go into a fixed-size ring buffer in memory. A
+# background task writes the buffer to disk off the event loop, at most
+# once per flush interval, so the file never grows past `size` entries
+# and the webhook handler never touches the disk.
+
+
+class PayloadCapture:
+    def __init__(self, path, size=200, sample_rate=1.0, enabled=True, flush_interval=2.0):
+        self.path = path
+        self.enabled = enabled and size > 0 and sample_rate > 0
+        self.sample_rate = sample_rate
+        self.flush_interval = flush_interval
+        self.ring = deque(maxlen=max(size, 1))
+        self._dirty = None
+        self._task = None
+
+    def capture(self, payload):
+        """Records one payload. O(1), never blocks."""
+        if not self.enabled:
+            return
+        if self.sample_rate < 1.0 and random.random() >= self.sample_rate:
+            return
+        self.ring.append({
+            "timestamp": datetime.datetime.now().isoformat(),
+            "payload": payload
+        })
+        if self._dirty is not None:
+            self._dirty.set()
+
+    # --- Background writer ---
+
+    async def start(self):
+        if not self.enabled or self._task is not None:
+            return
+        await asyncio.to_thread(self._load_existing)
+        self._dirty = asyncio.Event()
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is None:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+        # Final flush so nothing captured since the last write is lost
+        await asyncio.to_thread(self._write, list(self.ring))
+
+    async def _run(self):
+        while True:
+            await self._dirty.wait()
+            self._dirty.clear()
+            try:
+                await asyncio.to_thread(self._write, list(self.ring))
+            except Exception as e:
+                print(f"Payload capture write failed: {e}")
+            # Coalesce bursts into one write per interval
+            await asyncio.sleep(self.flush_interval)
+
+    def _write(self, entries):
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(entries, f, indent=2)
+        os.replace(tmp_path, self.path)
+
+    def _load_existing(self):
+        """Seeds the ring with the newest entries from a previous run."""
+        if not os.path.exists(self.path):
+            return
+        try:
+            with open(self.path, "r") as f:
+                self.ring.extend(json.load(f))
+        except Exception as e:
+            print(f"Payload capture: ignoring unreadable {self.path}: {e}")
@@ -0,0 +1,61 @@
+import hashlib
+import json
+import threading
+
+# ==========================================
+# VERSIONED RESPONSE CACHE
+# ==========================================
+# Keeps ready-to-send JSON bodies with a strong ETag, each tagged with the
+# data version it was built from (AnalyticsView.version: the versions of
+# the aggregates themselves). A body is only served while that version is
+# current, so it can never outlive the data, whatever order the store's
+# write listeners run in.
+
+
+def etag_matches(if_none_match, etag):
+    """If-None-Match check (weak comparison, as RFC 9110 requires for this header)."""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    for candidate in if_none_match.split(","):
+        candidate = candidate.strip()
+        if candidate.startswith("W/"):
+            candidate = candidate[2:]
+        if candidate == etag:
+            return True
+    return False
+
+
+class VersionedResponseCache:
+    def __init__(self):
+        self.version = None  # Data version of the kept bodies
+        self._entries = {}  # key -> (body bytes, etag)
+        self._lock = threading.Lock()
+
+    def invalidate(self):
+        with self._lock:
+            self.version = None
+            self._entries.clear()
+
+    def get(self, key, version):
+        """(body, etag) built from data `version`, or None."""
+        with self._lock:
+            if version != self.version:
+                return None
+            return self._entries.get(key)
+
+    def put(self, key, version, payload):
+        """
+        Serializes payload once and keeps it under `version`, the data
+        version read before the payload was built. If a write landed during
+        the build, the next request sees a newer version and rebuilds.
+        """
+        body = json.dumps(payload, separators=(",", ":")).encode("utf-8")
+        etag = '"' + hashlib.blake2b(body, digest_size=16).hexdigest() + '"'
+        with self._lock:
+            if version != self.version:
+                self._entries.clear()  # Bodies of older data are dead
+                self.version = version
+            self._entries[key] = (body, etag)
+        return body, etag
@@ -0,0 +1,208 @@
+import json
+import os
+import sqlite3
+import threading
+from datetime import datetime
+
+from journal import record_key
+from log_store import TYPE_CODES, to_epoch
+from models import parse_log_record
+
+# ==========================================
+# SQLITE CALL LOG STORE
+# ==========================================
+# Optional backend (CALL_LOG_BACKEND=sqlite) with the same interface as
+# CallLogJournal: append_unique / iter_records / subscribe. WAL mode lets
+# readers run while the webhook writes. Records are read back in wall-clock
+# order from the index on `ts`, and a `since` bound is a range scan on it.
+# The per-day window queries are answered by the live analytics
+# (analytics.py), not here.
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS call_logs (
+    id INTEGER PRIMARY KEY,
+    name TEXT NOT NULL,
+    number TEXT NOT NULL,
+    duration INTEGER NOT NULL,
+    type TEXT NOT NULL,
+    timestamp TEXT NOT NULL,
+    ts INTEGER NOT NULL,
+    ctype INTEGER NOT NULL,
+    dedupe_key BLOB UNIQUE
+);
+CREATE INDEX IF NOT EXISTS idx_call_logs_ts ON call_logs(ts);
+CREATE INDEX IF NOT EXISTS idx_call_logs_number ON call_logs(number);
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT
+);
+"""
+
+COLUMNS = "name, number, duration, type, timestamp"
+
+
+class SqliteCallLogStore:
+    def __init__(self, path, migrate_from=()):
+        self.path = path
+        self._lock = threading.Lock()  # Serializes writers and listener calls
+        self._local = threading.local()  # One read connection per thread
+        self._listeners = []
+        self._writer = self._connect()
+        self._writer.executescript(SCHEMA)
+        self._migrate(migrate_from)
+
+    def _connect(self):
+        conn = sqlite3.connect(self.path, check_same_thread=False)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        return conn
+
+    def _reader(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = self._local.conn = self._connect()
+        return conn
+
+    # --- Writing ---
+
+    def subscribe(self, listener, replay=False):
+        """Same contract as CallLogJournal.subscribe."""
+        with self._lock:
+            if replay:
+                batch = []
+                for record in self.iter_records():
+                    batch.append(record)
+                    if len(batch) >= 1000:
+                        listener(batch)
+                        batch = []
+                if batch:
+                    listener(batch)
+            self._listeners.append(listener)
+
+    def unsubscribe(self, listener):
+        """Same contract as CallLogJournal.unsubscribe."""
+        with self._lock:
+            if listener in self._listeners:
+                self._listeners.remove(listener)
+
+    def append(self, record):
+        self.append_many([record])
+
+    def append_many(self, records, durable=False):
+        # The dedupe key is a UNIQUE column, so every insert is idempotent
+        self.append_unique(records, durable)
+
+    def append_unique(self, records, durable=False):
+        """
+        Inserts records not stored yet, in one transaction. Returns the inserted ones.
+        With durable=True the commit is fsynced (synchronous=FULL) before returning.
+        """
+        with self._lock:
+            fresh = []
+            self._writer.execute(f"PRAGMA synchronous={'FULL' if durable else 'NORMAL'}")
+            with self._writer:
+                for r in records:
+                    try:
+                        row = self._row(r)
+                    except Exception as e:
+                        print(f"SQLite store: skipping bad log {r}: {e}")
+                        continue
+                    cursor = self._writer.execute(
+                        "INSERT OR IGNORE INTO call_logs "
+                        "(name, number, duration, type, timestamp, ts, ctype, dedupe_key) "
+                        "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                        row
+                    )
+                    if cursor.rowcount:
+                        fresh.append(r)
+            for listener in (self._listeners if fresh else ()):
+                try:
+                    listener(fresh)
+                except Exception as e:
+                    print(f"Store listener failed: {e}")
+        return fresh
+
+    @staticmethod
+    def _row(record):
+        entry = parse_log_record(record)
+        return (
+            entry.name,
+            entry.number,
+            entry.duration_sec,
+            str(record.get("type", "INCOMING")),
+            str(record.get("timestamp", entry.timestamp.isoformat())),
+            to_epoch(entry.timestamp),
+            TYPE_CODES[entry.call_type],
+            record_key(record)
+        )
+
+    # --- Reading ---
+
+    def iter_records(self, since=None):
+        """Every record (or those at/after datetime `since`), oldest first."""
+        if since is None:
+            cursor = self._reader().execute(f"SELECT {COLUMNS} FROM call_logs ORDER BY ts, id")
+        else:
+            cursor = self._reader().execute(
+                f"SELECT {COLUMNS} FROM call_logs WHERE ts >= ? ORDER BY ts, id", (to_epoch(since),)
+            )
+        while True:
+            rows = cursor.fetchmany(1000)
+            if not rows:
+                break
+            for name, number, duration, call_type, timestamp in rows:
+                yield {"name": name, "number": number, "duration": duration, "type": call_type, "timestamp": timestamp}
+
+    # --- Migration ---
+
+    def _migrate(self, sources):
+        """
+        One-shot import of the flat-file logs (JSONL journal and/or the old
+        JSON array). Recorded in the meta table so it never runs twice.
+        """
+        done = self._writer.execute("SELECT value FROM meta WHERE key = 'migrated'").fetchone()
+        if done:
+            return
+
+        imported = 0
+        for path in sources:
+            if not os.path.exists(path):
+                continue
+            try:
+                with open(path, "r", encoding="utf-8", errors="replace") as f:
+                    head = f.read(1)
+                    f.seek(0)
+                    if head == "[":
+                        records = json.load(f)
+                    else:
+                        records = []
+                        for line in f:
+                            try:
+                                records.append(json.loads(line))
+                            except ValueError:
+                                continue # Torn line
+                imported += len(self.append_unique([r for r in records if isinstance(r, dict)]))
+            except Exception as e:
+                print(f"SQLite store: could not migrate {path}: {e}")
+
+        with self._writer:
+            self._writer.execute(
+                "INSERT OR REPLACE INTO meta (key, value) VALUES ('migrated', ?)",
+                (datetime.now().isoformat(),)
+            )
+        if imported:
+            print(f"SQLite store: migrated {imported} logs into {self.path}")
+
+
+_stores = {}
+_stores_lock = threading.Lock()
+
+
+def open_sqlite_store(path, migrate_from=()):
+    key = os.path.abspath(path)
+    with _stores_lock:
+        store = _stores.get(key)
+        if store is None:
+            store = SqliteCallLogStore(path, migrate_from)
+            _stores[key] = store
+        return store
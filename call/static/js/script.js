@@ -1,10 +1,43 @@
+const POLL_INTERVAL_MS = 30000;  // Only used when the browser has no EventSource
+
+let lastEtag = null;  // Server answers 304 while nothing new has been logged
+let timeChart = null;
+let current = null;   // Latest full analysis; stream deltas are merged into it
+
 document.addEventListener("DOMContentLoaded", () => {
-    fetchData();
+    if (window.EventSource) {
+        subscribe();
+    } else {
+        fetchData();
+        setInterval(fetchData, POLL_INTERVAL_MS);
+    }
 });
 
+function subscribe() {
+    // Snapshot on connect, then only the changed keys after each new call.
+    // EventSource reconnects by itself and gets a fresh snapshot.
+    const source = new EventSource('/api/stream');
+
+    source.addEventListener("analysis", (event) => {
+        current = Object.assign(current || {}, JSON.parse(event.data));
+        updateUI(current);
+    });
+
+    source.onerror = () => {
+        if (source.readyState === EventSource.CLOSED) {
+            document.getElementById("status-heading").innerText = "Error";
+            document.getElementById("status-reason").innerText = "Could not connect to analysis engine.";
+        }
+    };
+}
+
 async function fetchData() {
     try {
-        const response = await fetch('/api/analyze');
+        const headers = lastEtag ? { "If-None-Match": lastEtag } : {};
+        const response = await fetch('/api/analyze', { headers, cache: "no-store" });
+        if (response.status === 304) return; // Unchanged since the last poll
+
+        lastEtag = response.headers.get("ETag");
         const data = await response.json();
 
         updateUI(data);
@@ -55,6 +88,10 @@ function updateUI(data) {
     document.getElementById("trend-dur").innerText = `vs Baseline: ${data.comparison.baseline_dur}`;
 
     document.getElementById("val-contact").innerText = data.metrics.most_contacted;
+    if (data.top_contacts) {
+        const recent = data.top_contacts.recent.slice(0, 3).map(c => `${c.name} (${c.count})`);
+        document.getElementById("top-contacts").innerText = recent.length ? `This week: ${recent.join(", ")}` : "";
+    }
 
     // 4. Chart (Time Distribution)
     renderChart(data.time_distribution);
@@ -70,7 +107,15 @@ function renderChart(dist) {
     const labels = Object.keys(dist);
     const values = Object.values(dist);
 
-    new Chart(ctx, {
+    // Re-use the chart on refresh instead of stacking new ones on the canvas
+    if (timeChart) {
+        timeChart.data.labels = labels;
+        timeChart.data.datasets[0].data = values;
+        timeChart.update();
+        return;
+    }
+
+    timeChart = new Chart(ctx, {
         type: 'bar',
         data: {
             labels: labels,
@@ -6,13 +6,18 @@ from pathlib import Path
 BASE_DIR = Path(__file__).resolve().parent
 CLIENT_SECRET_FILE = BASE_DIR / "client_secret.json"
 
+# Local fake of the Fitness API (services/fake_fitness.py) - no Google account needed
+USE_FAKE_FITNESS_API = os.getenv("FIT_FAKE_API", "0") == "1"
+
 # Verify secret exists
-if not CLIENT_SECRET_FILE.exists():
+if not CLIENT_SECRET_FILE.exists() and not USE_FAKE_FITNESS_API:
     raise FileNotFoundError(f"Client secret file not found at {CLIENT_SECRET_FILE}")
 
 # Load secret to get client config (optional, but good for validation)
-with open(CLIENT_SECRET_FILE, 'r') as f:
-    CLIENT_CONFIG = json.load(f)
+CLIENT_CONFIG = {}
+if CLIENT_SECRET_FILE.exists():
+    with open(CLIENT_SECRET_FILE, 'r') as f:
+        CLIENT_CONFIG = json.load(f)
 
 # OAuth Scopes
 SCOPES = [
@@ -26,3 +31,18 @@ SCOPES = [
 # Usually for local dev it's http://localhost:8000/auth/google/fit/callback or similar
 # The user specified the callback endpoint as: /auth/google/fit/callback
 REDIRECT_URI = "http://localhost:8000/auth/google/fit/callback"
+
+# Incremental Fit sync
+# Only days after the last fully-closed synced day (the "high-water mark") are
+# fetched again, plus a few closed days before it for data that syncs late.
+SYNC_STATE_FILE = BASE_DIR / "sync_state.json"
+SYNC_HISTORY_DAYS = int(os.getenv("FIT_SYNC_HISTORY_DAYS", "30"))  # Days kept in data_raw.json (and fetched on the first sync)
+SYNC_REFETCH_DAYS = int(os.getenv("FIT_SYNC_REFETCH_DAYS", "2"))  # Closed days re-fetched on every sync
+
+# /sync fetches every source at once; each gets this many seconds before it is
+# reported as timed out and the sync goes on with what it has
+SYNC_TIMEOUTS = {
+    "metrics": float(os.getenv("FIT_SYNC_TIMEOUT", "20")),
+    "sleep": float(os.getenv("FIT_SYNC_TIMEOUT", "20")),
+    "calendar": float(os.getenv("CALENDAR_SYNC_TIMEOUT", "20")),
+}
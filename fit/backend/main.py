@@ -70,21 +70,14 @@ def callback(request: Request, code: str, state: str = None):
         # Redirect to frontend with error
         return RedirectResponse(f"http://localhost:5173?error={str(e)}")
 
-from services.fit_service import sync_data
-from services.processing import process_and_validate
-from services.calendar_service import sync_calendar_context
+from services.sync_pipeline import run_sync
 
 @app.post("/sync")
-def trigger_sync():
+def trigger_sync(full: bool = False):
+    # Fit metrics, sleep and calendar are fetched concurrently; failed or
+    # timed-out sources are listed in "sources" / "failed_sources"
     try:
-        raw_data = sync_data()
-        calendar_context = sync_calendar_context()
-        quality_report = process_and_validate()
-        return {
-            "status": "success", 
-            "quality": quality_report,
-            "calendar_days_analyzed": len(calendar_context)
-        }
+        return run_sync(full=full)
     except Exception as e:
         import traceback
         traceback.print_exc()
@@ -100,9 +93,8 @@ def get_insights():
         # For now, assumes sync was called.
         report = calculate_insights()
         if not report:
-             # Try syncing if no data
-             sync_data()
-             process_and_validate()
+             # Try syncing if no data (same concurrent pipeline as /sync)
+             run_sync()
              report = calculate_insights()
              
         if not report:
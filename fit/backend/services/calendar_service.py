@@ -1,17 +1,20 @@
 import datetime
-from googleapiclient.discovery import build
 from services.auth import get_credentials
-from config import BASE_DIR
+from services.google_clients import get_client
+from config import BASE_DIR, USE_FAKE_FITNESS_API
 import json
 
-def get_calendar_service():
-    creds = get_credentials()
+def get_calendar_service(creds=None):
+    if USE_FAKE_FITNESS_API:
+        from services.fake_fitness import FakeCalendarService
+        return FakeCalendarService()
+    creds = creds or get_credentials()
     if not creds:
         raise Exception("User not logged in")
-    return build('calendar', 'v3', credentials=creds)
+    return get_client('calendar', 'v3', creds)
 
-def fetch_recent_events(days=30):
-    service = get_calendar_service()
+def fetch_recent_events(days=30, service=None):
+    service = service or get_calendar_service()
     
     now = datetime.datetime.utcnow()
     end_time = now.isoformat() + 'Z' # 'Z' indicates UTC time
@@ -102,8 +105,7 @@ def analyze_calendar_context(events):
         
     return results
 
-def sync_calendar_context():
-    events = fetch_recent_events(days=30)
+def save_calendar_context(events):
     context_map = analyze_calendar_context(events)
     
     # Save context map
@@ -0,0 +1,179 @@
+import datetime
+import hashlib
+import json
+import os
+import time
+
+# Local stand-ins for build('fitness', 'v1') and build('calendar', 'v3') so
+# the sync can run (and be measured) without a Google account. They answer
+# the calls the sync makes, with deterministic per-day data shaped like the
+# real responses:
+#   users().dataset().aggregate(userId, body).execute()
+#   users().sessions().list(userId, startTime, endTime, ...).execute()
+#   events().list(calendarId, timeMin, timeMax, ...).execute()
+# Every execute() is counted in `calls`, and its JSON size in `bytes`.
+# FIT_FAKE_LATENCY (seconds) delays each execute() like a network round-trip.
+
+DAY_MS = 86400000
+FAKE_LATENCY = float(os.getenv("FIT_FAKE_LATENCY", "0"))
+
+
+def _day_seed(date_str, salt):
+    digest = hashlib.sha256(f"{salt}:{date_str}".encode()).digest()
+    return int.from_bytes(digest[:4], "big")
+
+
+def _parse_rfc3339(value):
+    return datetime.datetime.fromisoformat(value.rstrip('Z'))
+
+
+class _Request:
+    def __init__(self, fake, method, handler):
+        self.fake = fake
+        self.method = method
+        self.handler = handler
+
+    def execute(self):
+        if self.fake.latency:
+            time.sleep(self.fake.latency)
+        response = self.handler()
+        self.fake.calls += 1
+        self.fake.bytes += len(json.dumps(response))
+        self.fake.log.append(self.method)
+        return response
+
+
+class _Dataset:
+    def __init__(self, fake):
+        self.fake = fake
+
+    def aggregate(self, userId, body):
+        return _Request(self.fake, "dataset.aggregate", lambda: self.fake.aggregate_response(body))
+
+
+class _Sessions:
+    def __init__(self, fake):
+        self.fake = fake
+
+    def list(self, userId, startTime, endTime, activityType=None, includeDeleted=False):
+        return _Request(self.fake, "sessions.list", lambda: self.fake.sessions_response(startTime, endTime))
+
+
+class FakeFitnessService:
+    def __init__(self, seed="cognia", latency=None):
+        self.seed = seed
+        self.latency = FAKE_LATENCY if latency is None else latency
+        self.calls = 0
+        self.bytes = 0
+        self.log = []
+
+    def users(self):
+        return self
+
+    def dataset(self):
+        return _Dataset(self)
+
+    def sessions(self):
+        return _Sessions(self)
+
+    # --- Fake data ---
+
+    def day_values(self, date_str):
+        s = _day_seed(date_str, self.seed)
+        return {
+            "steps": 2000 + s % 9000,
+            "active_minutes": 10 + (s >> 8) % 80,
+            "sedentary_ms": (300 + (s >> 16) % 400) * 60000.0,
+        }
+
+    def aggregate_response(self, body):
+        start = int(body["startTimeMillis"])
+        end = int(body["endTimeMillis"])
+        step = int(body.get("bucketByTime", {}).get("durationMillis", DAY_MS))
+        buckets = []
+        t = start
+        while t < end:
+            date_str = datetime.datetime.fromtimestamp(t / 1000).date().isoformat()
+            v = self.day_values(date_str)
+            buckets.append({
+                "startTimeMillis": str(t),
+                "endTimeMillis": str(min(t + step, end)),
+                "dataset": [
+                    {
+                        "dataSourceId": "derived:com.google.step_count.delta:com.google.android.gms:aggregated",
+                        "point": [{"value": [{"intVal": v["steps"]}]}]
+                    },
+                    {
+                        "dataSourceId": "derived:com.google.active_minutes:com.google.android.gms:aggregated",
+                        "point": [{"value": [{"intVal": v["active_minutes"]}]}]
+                    },
+                    {
+                        "dataSourceId": "derived:com.google.activity_segment:com.google.android.gms:aggregated",
+                        "point": [{"value": [{"mapVal": [
+                            {"key": {"intVal": 3}, "value": {"fpVal": v["sedentary_ms"]}}
+                        ]}]}]
+                    }
+                ]
+            })
+            t += step
+        return {"bucket": buckets}
+
+    def sessions_response(self, start_time, end_time):
+        """One night of sleep per day, ending at 07:00 on that day."""
+        start = _parse_rfc3339(start_time)
+        end = _parse_rfc3339(end_time)
+        sessions = []
+        day = start.date()
+        while day <= end.date():
+            wake = datetime.datetime.combine(day, datetime.time(7, 0))
+            if start <= wake <= end:
+                minutes = 360 + _day_seed(day.isoformat(), self.seed + ":sleep") % 150
+                bed = wake - datetime.timedelta(minutes=minutes)
+                sessions.append({
+                    "id": f"sleep-{day.isoformat()}",
+                    "activityType": 72,
+                    "startTimeMillis": str(int(bed.timestamp() * 1000)),
+                    "endTimeMillis": str(int(wake.timestamp() * 1000))
+                })
+            day += datetime.timedelta(days=1)
+        return {"session": sessions}
+
+
+class _Events:
+    def __init__(self, fake):
+        self.fake = fake
+
+    def list(self, calendarId, timeMin, timeMax, singleEvents=True, orderBy=None):
+        return _Request(self.fake, "events.list", lambda: self.fake.events_response(timeMin, timeMax))
+
+
+class FakeCalendarService:
+    def __init__(self, seed="cognia", latency=None):
+        self.seed = seed
+        self.latency = FAKE_LATENCY if latency is None else latency
+        self.calls = 0
+        self.bytes = 0
+        self.log = []
+
+    def events(self):
+        return _Events(self)
+
+    def events_response(self, time_min, time_max):
+        """0-5 one-hour meetings per weekday, from 09:00 on the hour."""
+        start = _parse_rfc3339(time_min)
+        end = _parse_rfc3339(time_max)
+        items = []
+        day = start.date()
+        while day <= end.date():
+            count = 0 if day.weekday() >= 5 else _day_seed(day.isoformat(), self.seed + ":calendar") % 6
+            for i in range(count):
+                begin = datetime.datetime.combine(day, datetime.time(9 + i, 0))
+                if start <= begin <= end:
+                    items.append({
+                        "id": f"meeting-{day.isoformat()}-{i}",
+                        "summary": "Sync" if i else "Standup",
+                        "start": {"dateTime": begin.isoformat()},
+                        "end": {"dateTime": (begin + datetime.timedelta(hours=1)).isoformat()}
+                    })
+            day += datetime.timedelta(days=1)
+        return {"items": items}
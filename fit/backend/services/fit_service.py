@@ -1,24 +1,29 @@
 import os
 import datetime
 import json
-from google.oauth2.credentials import Credentials
-from google.auth.transport.requests import Request
-from googleapiclient.discovery import build
-from config import BASE_DIR, CLIENT_SECRET_FILE
-import pandas as pd
+import tempfile
+import threading
+from config import (
+    BASE_DIR, CLIENT_SECRET_FILE, USE_FAKE_FITNESS_API,
+    SYNC_STATE_FILE, SYNC_HISTORY_DAYS, SYNC_REFETCH_DAYS
+)
 
 from services.auth import get_credentials
+from services.google_clients import get_client
 
 # TOKEN_FILE = BASE_DIR / "token.json" 
 # (TOKEN_FILE usage moved to auth.py) - keeping the functions that need services...
 
 # Removed local get_credentials definition
 
-def get_fitness_service():
-    creds = get_credentials()
+def get_fitness_service(creds=None):
+    if USE_FAKE_FITNESS_API:
+        from services.fake_fitness import FakeFitnessService
+        return FakeFitnessService()
+    creds = creds or get_credentials()
     if not creds:
         raise Exception("User not logged in")
-    return build('fitness', 'v1', credentials=creds)
+    return get_client('fitness', 'v1', creds)
 
 def fetch_metrics(service, start_time, end_time):
     body = {
@@ -109,10 +114,11 @@ def fetch_metrics(service, start_time, end_time):
         
     return data
 
-def fetch_sleep_sessions(service, start_time, end_time):
+def fetch_sleep_sessions(service, start_time, end_time, strict=False):
     """
     Fetches sleep data using the Sessions API (Robust for sleep).
     Activity Type 72 = Sleep.
+    strict=True raises API errors instead of returning {}.
     """
     try:
         # Convert to RFC3339 string as required by sessions list
@@ -147,37 +153,87 @@ def fetch_sleep_sessions(service, start_time, end_time):
              
         return daily_sleep
     except Exception as e:
+        if strict:
+            raise
         print(f"Error fetching sleep sessions: {str(e)}")
         return {}
 
-def sync_data():
-    service = get_fitness_service()
-    
+# --- Incremental Sync ---
+
+RAW_PATH = BASE_DIR / "data_raw.json"
+
+def load_json(path, default):
+    try:
+        with open(path, 'r') as f:
+            return json.load(f)
+    except (FileNotFoundError, ValueError):
+        return default
+
+# /sync and /insights can sync at the same time (FastAPI threadpool)
+_store_lock = threading.Lock()
+
+def write_json_atomic(path, data):
+    # Own temp file per write, so concurrent writers never share one
+    with tempfile.NamedTemporaryFile('w', dir=os.path.dirname(path), prefix=os.path.basename(path) + '.',
+                                     suffix='.tmp', delete=False) as f:
+        json.dump(data, f)
+    os.replace(f.name, path)
+
+def sync_start(now, state, full=False):
+    """
+    Midnight of the first day to fetch: the day after the high-water mark
+    minus SYNC_REFETCH_DAYS (late data), or SYNC_HISTORY_DAYS back on a
+    first / full sync.
+    """
+    oldest = now.date() - datetime.timedelta(days=SYNC_HISTORY_DAYS)
+    first_day = oldest
+    high_water = state.get("high_water")
+    if high_water and not full:
+        resume = datetime.date.fromisoformat(high_water) + datetime.timedelta(days=1 - SYNC_REFETCH_DAYS)
+        first_day = max(oldest, resume)
+    return datetime.datetime.combine(first_day, datetime.time())
+
+def sync_window(full=False):
+    """(now, sync state, start of the fetch window) for the next sync."""
     now = datetime.datetime.now()
-    start_time = now - datetime.timedelta(days=30)
-    
-    # 1. Fetch Aggregated Metrics (Steps, Active Min)
-    metrics_list = fetch_metrics(service, start_time, now)
-    
-    # 2. Fetch Sleep Sessions (Sessions API)
-    sleep_map = fetch_sleep_sessions(service, start_time, now)
-    
-    # 3. Merge Sleep into Metrics
-    final_data = []
-    for entry in metrics_list:
-        d = entry['date']
-        # If we have Session-based sleep, overwrite/set the sleep_minutes
-        if d in sleep_map:
-            entry['sleep_minutes'] = int(sleep_map[d])
-        else:
-             # Keep existing (which is 0 from fallback) or set to 0
-             # entry['sleep_minutes'] = 0
-             pass
-        final_data.append(entry)
-    
-    # Store Raw Data (JSON)
-    raw_path = BASE_DIR / "data_raw.json"
-    with open(raw_path, 'w') as f:
-        json.dump(final_data, f)
+    state = load_json(SYNC_STATE_FILE, {})
+    return now, state, sync_start(now, state, full)
+
+def store_fit_data(now, state, start_time, metrics_list, sleep_map, full=False):
+    """
+    Merges fetched days into data_raw.json and moves the high-water mark.
+    sleep_map=None (sleep fetch failed) keeps the stored sleep for those days
+    and leaves the mark where it was, so the next sync fetches them again.
+    """
+    # Read-merge-write as one step, or a concurrent sync's days could be lost
+    with _store_lock:
+        stored = {} if full else {e['date']: e for e in load_json(RAW_PATH, [])}
+        
+        # Merge Sleep into Metrics
+        fetched = []
+        for entry in metrics_list:
+            d = entry['date']
+            # If we have Session-based sleep, overwrite/set the sleep_minutes
+            if sleep_map is None:
+                if d in stored:
+                    entry['sleep_minutes'] = stored[d].get('sleep_minutes', 0)
+            elif d in sleep_map:
+                entry['sleep_minutes'] = int(sleep_map[d])
+            fetched.append(entry)
+        
+        # Merge into the stored dataset by date (fetched days win), keep SYNC_HISTORY_DAYS
+        for entry in fetched:
+            stored[entry['date']] = entry
+        oldest = (now.date() - datetime.timedelta(days=SYNC_HISTORY_DAYS)).isoformat()
+        final_data = [stored[d] for d in sorted(stored) if d >= oldest]
+        
+        # Store Raw Data (JSON), then move the high-water mark to the last closed day
+        write_json_atomic(RAW_PATH, final_data)
+        if sleep_map is not None:
+            write_json_atomic(SYNC_STATE_FILE, {
+                "high_water": (now.date() - datetime.timedelta(days=1)).isoformat(),
+                "last_sync": now.isoformat(timespec='seconds')
+            })
+        print(f"Fit sync: fetched {len(fetched)} days from {start_time.date()} ({'full' if full or not state else 'incremental'})")
         
     return final_data
@@ -0,0 +1,72 @@
+import json
+import threading
+
+import google_auth_httplib2
+import httplib2
+from googleapiclient.discovery import build_from_document
+
+# ==========================================
+# GOOGLE API CLIENT REGISTRY
+# ==========================================
+# build() reads (or downloads) and parses the discovery document and opens a
+# new HTTP transport every time, so each /sync paid connection + TLS setup
+# again. Here:
+#   - each discovery document is loaded once per process, from the copy
+#     bundled with google-api-python-client (fetched once if it isn't there)
+#   - each thread keeps its own client per API, on its own keep-alive
+#     httplib2 connection (httplib2.Http is not thread-safe, so clients
+#     aren't shared between threads)
+#   - a thread's client is rebuilt only when the credentials change (another
+#     account / re-login); a refreshed token is just handed to its transport
+
+DISCOVERY_URL = "https://www.googleapis.com/discovery/v1/apis/{api}/{version}/rest"
+HTTP_TIMEOUT = 30  # Seconds per request
+
+_documents = {}
+_documents_lock = threading.Lock()
+_local = threading.local()
+
+
+def _discovery_document(api, version):
+    with _documents_lock:
+        doc = _documents.get((api, version))
+        if doc is None:
+            doc = _load_document(api, version)
+            _documents[(api, version)] = doc
+    return doc
+
+
+def _load_document(api, version):
+    try:
+        from googleapiclient.discovery_cache import get_static_doc
+        content = get_static_doc(api, version)
+    except ImportError:
+        content = None  # google-api-python-client < 2.0 ships no documents
+    if content is None:
+        print(f"No bundled discovery document for {api} {version}, fetching it")
+        resp, content = httplib2.Http(timeout=HTTP_TIMEOUT).request(DISCOVERY_URL.format(api=api, version=version))
+        if resp.status != 200:
+            raise Exception(f"Could not fetch discovery document for {api} {version}: HTTP {resp.status}")
+    return json.loads(content)
+
+
+def _credentials_key(creds):
+    """Identifies the account/grant behind `creds`; unchanged by token refreshes."""
+    return (creds.client_id, creds.refresh_token or creds.token, tuple(sorted(creds.scopes or ())))
+
+
+def get_client(api, version, creds):
+    """This thread's client for `api` `version` authorized with `creds` (built on first use)."""
+    clients = getattr(_local, "clients", None)
+    if clients is None:
+        clients = _local.clients = {}
+    key = _credentials_key(creds)
+    cached = clients.get((api, version))
+    if cached is not None and cached[0] == key:
+        cached[2].credentials = creds  # Latest token, saves a refresh
+        return cached[1]
+
+    http = google_auth_httplib2.AuthorizedHttp(creds, http=httplib2.Http(timeout=HTTP_TIMEOUT))
+    client = build_from_document(_discovery_document(api, version), http=http)
+    clients[(api, version)] = (key, client, http)
+    return client
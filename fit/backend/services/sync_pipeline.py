@@ -0,0 +1,112 @@
+import time
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeout
+
+from config import SYNC_TIMEOUTS, USE_FAKE_FITNESS_API
+from services.auth import get_credentials
+from services.fit_service import (
+    get_fitness_service, fetch_metrics, fetch_sleep_sessions, sync_window, store_fit_data
+)
+from services.calendar_service import get_calendar_service, fetch_recent_events, save_calendar_context
+from services.processing import process_and_validate
+
+# ==========================================
+# /sync PIPELINE
+# ==========================================
+# The three remote fetches (Fit metrics, Fit sleep sessions, Calendar events)
+# don't depend on each other, so they run at the same time on a shared
+# thread pool and the sync takes about as long as the slowest one.
+# Each source has its own timeout (SYNC_TIMEOUTS). A source that fails or
+# times out is reported, and the merge goes on with the data from the rest
+# (the stored data for that source stays as it was). Then processing runs.
+#
+# Each worker thread uses its own cached API clients (services/google_clients.py):
+# the httplib2 transport underneath is not thread-safe. Credentials are loaded
+# (and refreshed) once, up front.
+
+SOURCES = ("metrics", "sleep", "calendar")
+
+# A timed-out call keeps its worker until it returns, so leave spare room
+_pool = ThreadPoolExecutor(max_workers=len(SOURCES) * 2, thread_name_prefix="sync")
+
+
+def _fetch_metrics(creds, start_time, end_time):
+    return fetch_metrics(get_fitness_service(creds), start_time, end_time)
+
+
+def _fetch_sleep(creds, start_time, end_time):
+    return fetch_sleep_sessions(get_fitness_service(creds), start_time, end_time, strict=True)
+
+
+def _fetch_calendar(creds):
+    return fetch_recent_events(days=30, service=get_calendar_service(creds))
+
+
+def _timed(fn, *args):
+    t0 = time.perf_counter()
+    result = fn(*args)
+    return result, time.perf_counter() - t0
+
+
+def _collect(futures):
+    """
+    {source: (result or None, report)}. Waits at most each source's timeout
+    from now; a source that is already done by the time it is checked is used.
+    """
+    t0 = time.perf_counter()
+    results = {}
+    for name, future in futures.items():
+        remaining = max(0.0, t0 + SYNC_TIMEOUTS[name] - time.perf_counter())
+        try:
+            result, seconds = future.result(timeout=remaining)
+            results[name] = (result, {"status": "ok", "seconds": round(seconds, 3)})
+        except FutureTimeout:
+            future.cancel()
+            results[name] = (None, {"status": "timeout", "seconds": SYNC_TIMEOUTS[name]})
+        except Exception as e:
+            results[name] = (None, {"status": "error", "error": str(e)})
+    return results
+
+
+def run_sync(full=False):
+    """Fetches all sources concurrently, merges what arrived, then processes. Returns the /sync report."""
+    t0 = time.perf_counter()
+    creds = None
+    if not USE_FAKE_FITNESS_API:
+        creds = get_credentials()
+        if not creds:
+            raise Exception("User not logged in")
+
+    now, state, start_time = sync_window(full)
+    futures = {
+        "metrics": _pool.submit(_timed, _fetch_metrics, creds, start_time, now),
+        "sleep": _pool.submit(_timed, _fetch_sleep, creds, start_time, now),
+        "calendar": _pool.submit(_timed, _fetch_calendar, creds),
+    }
+    results = _collect(futures)
+    sources = {name: report for name, (_, report) in results.items()}
+    for name, report in sources.items():
+        if report["status"] != "ok":
+            print(f"Sync source {name} failed: {report.get('error', report['status'])}")
+
+    failed = [name for name, report in sources.items() if report["status"] != "ok"]
+    if len(failed) == len(SOURCES):
+        raise Exception(f"All sync sources failed: {sources}")
+
+    # Merge: Fit needs the metrics; missing sleep keeps what was stored
+    metrics_list = results["metrics"][0]
+    if metrics_list is not None:
+        store_fit_data(now, state, start_time, metrics_list, results["sleep"][0], full)
+
+    calendar_context = None
+    if results["calendar"][0] is not None:
+        calendar_context = save_calendar_context(results["calendar"][0])
+
+    quality_report = process_and_validate()
+    return {
+        "status": "partial" if failed else "success",
+        "quality": quality_report,
+        "calendar_days_analyzed": len(calendar_context) if calendar_context is not None else None,
+        "sources": sources,
+        "failed_sources": failed,
+        "elapsed_seconds": round(time.perf_counter() - t0, 3)
+    }
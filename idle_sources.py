@@ -0,0 +1,163 @@
+import ctypes
+import os
+import re
+import shutil
+import subprocess
+import sys
+import time
+
+# ==========================================
+# INPUT-IDLE SOURCES
+# ==========================================
+# idle_seconds() -> seconds since the last keyboard / mouse input, or None
+# when the source can't tell (then the tracker assumes the user is there).
+#   - macos:      CoreGraphics' HID idle time, called in-process (ctypes)
+#   - x11:        XScreenSaver extension via python-xlib, else `xprintidle`
+#   - interrupts: Linux /proc/interrupts; any change in keyboard / mouse
+#                 interrupt counts counts as input. USB input shares its
+#                 controller's line (xhci_hcd) with every other USB device,
+#                 so with no dedicated input line it can't tell (None).
+#   - fake:       set by hand (tests / demos)
+
+
+class IdleSource:
+    name = None
+
+    def idle_seconds(self):
+        raise NotImplementedError
+
+
+class MacIdleSource(IdleSource):
+    """Same counter `ioreg` shows as HIDIdleTime, without forking a process per sample."""
+    name = "macos"
+    CORE_GRAPHICS = "/System/Library/Frameworks/CoreGraphics.framework/CoreGraphics"
+    COMBINED_SESSION_STATE = 0  # kCGEventSourceStateCombinedSessionState
+    ANY_INPUT_EVENT = 0xFFFFFFFF  # kCGAnyInputEventType
+
+    def __init__(self):
+        try:
+            since_last = ctypes.cdll.LoadLibrary(self.CORE_GRAPHICS).CGEventSourceSecondsSinceLastEventType
+            since_last.argtypes = [ctypes.c_int32, ctypes.c_uint32]
+            since_last.restype = ctypes.c_double
+        except (OSError, AttributeError) as e:
+            print(f"macos idle source: CoreGraphics unavailable ({e})")
+            since_last = None
+        self._since_last = since_last
+
+    def idle_seconds(self):
+        if self._since_last is None:
+            return None
+        return self._since_last(self.COMBINED_SESSION_STATE, self.ANY_INPUT_EVENT)
+
+
+class XScreenSaverIdleSource(IdleSource):
+    name = "x11"
+
+    def __init__(self):
+        from Xlib import display
+        from Xlib.ext import screensaver  # noqa: F401 (registers query_info)
+        self._display = display.Display()
+        self._root = self._display.screen().root
+
+    def idle_seconds(self):
+        try:
+            return self._root.screensaver_query_info().idle / 1000.0
+        except Exception:
+            return None
+
+
+class XprintidleSource(IdleSource):
+    name = "x11"
+
+    def idle_seconds(self):
+        try:
+            return int(subprocess.check_output(["xprintidle"], text=True, timeout=2)) / 1000.0
+        except Exception:
+            return None
+
+
+class InterruptsIdleSource(IdleSource):
+    """No X needed: watches the input-device interrupt counters in /proc/interrupts."""
+    name = "interrupts"
+    INPUT_DEVICES = re.compile(r"i8042|keyboard|mouse|touchpad|hid", re.IGNORECASE)
+
+    def __init__(self, path="/proc/interrupts"):
+        self.path = path
+        self._last_total = None
+        self._last_input = time.monotonic()
+
+    def _input_interrupts(self):
+        """Summed counts of the input-device lines, or None if there is no such line."""
+        total = None
+        with open(self.path, "r") as f:
+            for line in f:
+                if not self.INPUT_DEVICES.search(line):
+                    continue
+                total = total or 0
+                for field in line.split()[1:]:
+                    if not field.isdigit():
+                        break
+                    total += int(field)
+        return total
+
+    def idle_seconds(self):
+        try:
+            total = self._input_interrupts()
+        except OSError:
+            return None
+        if total is None:
+            return None  # Input goes through a shared (USB) line: can't tell
+        now = time.monotonic()
+        if total != self._last_total:
+            self._last_total = total
+            self._last_input = now
+        return now - self._last_input
+
+
+class FakeIdleSource(IdleSource):
+    name = "fake"
+
+    def __init__(self, idle=0.0):
+        self._idle_since = time.monotonic() - idle
+
+    def set_idle(self, seconds):
+        self._idle_since = time.monotonic() - seconds
+
+    def touch(self):
+        """Simulates input now."""
+        self.set_idle(0)
+
+    def idle_seconds(self):
+        return time.monotonic() - self._idle_since
+
+
+def x11_idle_source():
+    try:
+        return XScreenSaverIdleSource()
+    except Exception:
+        if shutil.which("xprintidle"):
+            return XprintidleSource()
+        return InterruptsIdleSource()
+
+
+IDLE_SOURCES = {
+    "macos": MacIdleSource,
+    "x11": x11_idle_source,
+    "interrupts": InterruptsIdleSource,
+    "fake": FakeIdleSource,
+}
+
+
+def get_idle_source(name=None):
+    """By name (or $SCREEN_TRACKER_IDLE_SOURCE), else whatever fits this machine. None = no idle detection."""
+    name = name or os.getenv("SCREEN_TRACKER_IDLE_SOURCE")
+    if not name:
+        if sys.platform == "darwin":
+            name = "macos"
+        elif sys.platform.startswith("linux"):
+            name = "x11" if os.getenv("DISPLAY") else "interrupts"
+        else:
+            return None
+    if name == "none":
+        return None
+    return IDLE_SOURCES[name]()
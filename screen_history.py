@@ -0,0 +1,127 @@
+import datetime
+import mmap
+import os
+import struct
+import threading
+
+# ==========================================
+# MULTI-DAY SCREEN-TIME HISTORY
+# ==========================================
+# One fixed-width record per calendar day in a memory-mapped file:
+#   24 x uint16   active seconds per hour            (48 bytes)
+#   1440 bits     minute bitmap: any activity in it  (180 bytes)
+# Day N lives at HEADER_SIZE + (N - base day) * RECORD_SIZE, so a year is
+# ~83 KB and any day is one slice away; reads never load the whole file.
+
+HISTORY_FILE = "screen_time_history.bin"
+MAGIC = b"SCRH"
+HEADER = struct.Struct("<4sHHI")  # magic, format version, record size, base day (ordinal)
+HEADER_SIZE = 16
+HOURS_SIZE = 24 * 2
+BITMAP_SIZE = 1440 // 8
+RECORD_SIZE = HOURS_SIZE + BITMAP_SIZE
+HOUR = struct.Struct("<H")
+
+
+class ScreenHistory:
+    def __init__(self, path=HISTORY_FILE):
+        self.path = path
+        self._lock = threading.Lock()
+        self._carry = {}  # (day ordinal, hour) -> fraction of a second not written yet
+        self._mm = None
+        self.base = None
+        self.days = 0
+        if os.path.exists(path) and os.path.getsize(path) >= HEADER_SIZE:
+            self._open()
+
+    def _open(self):
+        with open(self.path, "r+b") as f:
+            magic, version, record_size, base = HEADER.unpack(f.read(HEADER.size))
+            if magic != MAGIC or record_size != RECORD_SIZE:
+                raise ValueError(f"{self.path} is not a screen-time history file")
+            self._mm = mmap.mmap(f.fileno(), 0)
+        self.base = base
+        self.days = (len(self._mm) - HEADER_SIZE) // RECORD_SIZE
+
+    def _ensure_day(self, ordinal):
+        """Makes sure `ordinal` has a record (creating / growing the file). Returns its offset or None."""
+        if self._mm is None:
+            with open(self.path, "wb") as f:
+                f.write(HEADER.pack(MAGIC, 1, RECORD_SIZE, ordinal).ljust(HEADER_SIZE, b"\0"))
+            self._open()
+        index = ordinal - self.base
+        if index < 0:
+            return None  # Before the file's first day (clock went back a lot)
+        if index >= self.days:
+            # Grow a month at a time so day changes rarely remap
+            days = index + 31
+            self._mm.flush()
+            self._mm.close()
+            with open(self.path, "r+b") as f:
+                f.truncate(HEADER_SIZE + days * RECORD_SIZE)
+            self._open()
+        return HEADER_SIZE + index * RECORD_SIZE
+
+    # --- Writing ---
+
+    def add(self, start, end):
+        """Marks wall-clock epoch seconds [start, end) as active, split by local hour and minute."""
+        with self._lock:
+            t = start
+            while t < end:
+                moment = datetime.datetime.fromtimestamp(t)
+                # Up to the next minute boundary (or `end`)
+                step = min(end - t, 60 - moment.second - moment.microsecond / 1e6)
+                self._add_minute(moment, step)
+                t += step
+
+    def _add_minute(self, moment, seconds):
+        ordinal = moment.toordinal()
+        offset = self._ensure_day(ordinal)
+        if offset is None:
+            return
+        key = (ordinal, moment.hour)
+        total = self._carry.pop(key, 0.0) + seconds
+        whole = int(total)
+        if total > whole:
+            if len(self._carry) > 48:
+                self._carry.clear()  # Only the current hours matter
+            self._carry[key] = total - whole
+        if whole:
+            hour_at = offset + moment.hour * 2
+            value = HOUR.unpack_from(self._mm, hour_at)[0]
+            HOUR.pack_into(self._mm, hour_at, min(value + whole, 3600))
+        minute = moment.hour * 60 + moment.minute
+        bit_at = offset + HOURS_SIZE + minute // 8
+        self._mm[bit_at] |= 1 << (minute % 8)
+
+    def flush(self):
+        with self._lock:
+            if self._mm is not None:
+                self._mm.flush()
+
+    # --- Reading ---
+
+    def day(self, date):
+        """{"date", "total_seconds", "hours": [24], "minutes": hex bitmap} (zeros if not recorded)."""
+        with self._lock:
+            record = None
+            if self._mm is not None and 0 <= date.toordinal() - self.base < self.days:
+                offset = HEADER_SIZE + (date.toordinal() - self.base) * RECORD_SIZE
+                record = bytes(self._mm[offset:offset + RECORD_SIZE])
+        if record is None:
+            record = bytes(RECORD_SIZE)
+        hours = list(struct.unpack_from("<24H", record))
+        return {
+            "date": date.isoformat(),
+            "total_seconds": sum(hours),
+            "hours": hours,
+            "minutes": record[HOURS_SIZE:].hex()
+        }
+
+    def iter_days(self, first, last):
+        """Day records from `first` to `last` inclusive, one at a time."""
+        day = first
+        while day <= last:
+            yield self.day(day)
+            day += datetime.timedelta(days=1)
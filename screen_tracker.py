@@ -1,79 +1,264 @@
-import subprocess
+import queue
 import time
 import json
 import threading
-from http.server import BaseHTTPRequestHandler, HTTPServer
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
 import datetime
+from urllib.parse import urlsplit, parse_qs
+
+from app_sessions import SessionLog
+from stats_wal import StatsWAL
+from screen_history import ScreenHistory
+from window_providers import get_provider
+from idle_sources import get_idle_source
 
 # --- Configuration ---
 PORT = 8080
-POLL_INTERVAL = 1  # Seconds
+MIN_INTERVAL = 1  # Seconds between samples right after a change (app or idle state)
+MAX_INTERVAL = 16  # Samples back off (doubling) up to this while nothing changes
+IDLE_THRESHOLD = 120  # Seconds without keyboard / mouse input = user walked away
+LONG_POLL_TIMEOUT = 25  # Max seconds a /stats?since= request waits for a change
+CHECKPOINT_INTERVAL = 60  # Seconds between full state-file rewrites (ticks go to the WAL)
 
 # --- Persistence ---
-DATA_FILE = "screen_time_stats.json"
+DATA_FILE = "screen_time_stats.json"  # Checkpoint
+WAL_FILE = "screen_time_stats.wal"  # Ticks since the checkpoint (stats_wal.py)
+wal = StatsWAL(DATA_FILE, WAL_FILE)
 
 def load_stats():
-    try:
-        with open(DATA_FILE, "r") as f:
-            return json.load(f)
-    except FileNotFoundError:
-        return {"total_seconds": 0, "last_reset": str(datetime.date.today())}
+    return wal.load({"total_seconds": 0, "last_reset": str(datetime.date.today())})
 
 def save_stats(stats):
-    with open(DATA_FILE, "w") as f:
-        json.dump(stats, f)
+    wal.checkpoint(stats)
+
+# --- Published Snapshot ---
+class StatsSnapshot:
+    """
+    The tracker publishes every new stats dict once, already encoded; the
+    server only ever sends those bytes. Long-poll requests wait on the
+    condition until a newer version is published.
+    """
+    def __init__(self):
+        self._cond = threading.Condition()
+        self.version = 0
+        self.body = b"{}"
+
+    def publish(self, stats):
+        with self._cond:
+            body = json.dumps(dict(stats, version=self.version + 1)).encode()
+            self.version += 1
+            self.body = body
+            self._cond.notify_all()
+
+    def current(self):
+        with self._cond:
+            return self.version, self.body
+
+    def wait_newer(self, since, timeout=LONG_POLL_TIMEOUT):
+        """Returns (version, body) as soon as version > since, or the current one after `timeout`."""
+        with self._cond:
+            self._cond.wait_for(lambda: self.version > since, timeout)
+            return self.version, self.body
+
+snapshot = StatsSnapshot()
 
 # --- Tracker Logic ---
+# `stats` is only replaced, never mutated, so a published dict never changes
 stats = load_stats()
 if stats["last_reset"] != str(datetime.date.today()):
     stats = {"total_seconds": 0, "last_reset": str(datetime.date.today())}
+snapshot.publish(stats)
+
+provider = None  # Set in track(); see window_providers.py
+idle_source = None  # Set in track(); see idle_sources.py
+sessions = SessionLog()  # Per-app focus intervals (app_sessions.py)
+history = ScreenHistory()  # Per-day hour totals + minute bitmaps (screen_history.py)
 
 def get_active_app():
-    try:
-        # AppleScript to get the frontmost application name
-        cmd = ['osascript', '-e', 'tell application "System Events" to get name of first process whose frontmost is true']
-        output = subprocess.check_output(cmd).decode('utf-8').strip()
-        return output
-    except Exception:
-        return None
-
-def track():
-    global stats
+    """Frontmost application as last reported by the provider (None if unknown)."""
+    return provider.current() if provider else None
+
+def active_span(since, now, idle, was_idle):
+    """
+    Part of [since, now] (monotonic) the user was actually there, given the
+    idle time sampled at `now`. Returns (start, end); empty when start >= end.
+    """
+    if idle is None:
+        return since, now  # No idle source: any focused app counts
+    last_input = now - idle
+    if idle >= IDLE_THRESHOLD:
+        return since, min(now, last_input + IDLE_THRESHOLD)  # Counting stops at the threshold
+    if was_idle:
+        return max(since, last_input), now  # Came back at the last input
+    return since, now
+
+def track(window_provider=None, window_idle_source=None):
+    """
+    Event-driven with an adaptive clock: focus changes wake the loop at
+    once; otherwise it samples the idle source every MIN_INTERVAL after a
+    change, doubling up to MAX_INTERVAL while nothing changes. Only time
+    with a focused app and recent input is counted.
+    """
+    global stats, provider, idle_source
+    provider = window_provider or get_provider()
+    idle_source = window_idle_source if window_idle_source is not None else get_idle_source()
+    events = queue.Queue()
+    provider.start(events.put)
+
+    app = provider.current()
+    since = time.monotonic()
+    carry = 0.0  # Fractions of a second not yet added to total_seconds
+    last_checkpoint = since
+    interval = MIN_INTERVAL
+    was_idle = False
     while True:
-        app = get_active_app()
+        try:
+            new_app = events.get(timeout=interval)
+        except queue.Empty:
+            new_app = app  # No focus change, just a sample
+
+        now = time.monotonic()
+        wall_offset = time.time() - now
+        idle = idle_source.idle_seconds() if idle_source else None
+        is_idle = idle is not None and idle >= IDLE_THRESHOLD
+
         if app:
-            # We count time whenever ANY app is active (user is at computer)
-            # You could filter specifically for browsers or productivity apps here
-            stats["total_seconds"] += POLL_INTERVAL
-            
-            # Daily reset check
-            today = str(datetime.date.today())
-            if stats["last_reset"] != today:
-                stats = {"total_seconds": 0, "last_reset": today}
-            
-            if stats["total_seconds"] % 10 == 0: # Save every 10 seconds
-                save_stats(stats)
-                
-        time.sleep(POLL_INTERVAL)
+            start, end = active_span(since, now, idle, was_idle)
+            if end > start:
+                carry += end - start
+                sessions.record(app, start + wall_offset, end + wall_offset)
+                history.add(start + wall_offset, end + wall_offset)
+        if new_app != app or is_idle:
+            sessions.close()
+
+        # Sample fast around transitions, back off while nothing changes
+        if new_app != app or is_idle != was_idle:
+            interval = MIN_INTERVAL
+        else:
+            interval = min(interval * 2, MAX_INTERVAL)
+        since = now
+        app = new_app
+        was_idle = is_idle
+
+        # Daily reset check
+        today = str(datetime.date.today())
+        if stats["last_reset"] != today:
+            stats = {"total_seconds": 0, "last_reset": today}
+            carry = 0.0
+            snapshot.publish(stats)
+            sessions.compact()  # Age out runs past the retention window
+
+        if carry >= 1:
+            seconds = int(carry)
+            carry -= seconds
+            wal.append(today, seconds)  # Durable right away, one small append
+            stats = dict(stats, total_seconds=stats["total_seconds"] + seconds)
+            snapshot.publish(stats)
+
+        if now - last_checkpoint >= CHECKPOINT_INTERVAL:
+            save_stats(stats)
+            history.flush()
+            last_checkpoint = now
 
 # --- Server Logic ---
+def parse_time(value, default):
+    """Query value -> epoch seconds. Accepts epoch seconds, YYYY-MM-DD or an ISO datetime."""
+    if not value:
+        return default
+    try:
+        return float(value)
+    except ValueError:
+        return datetime.datetime.fromisoformat(value).timestamp()
+
+def app_totals(query):
+    """/stats/apps?from=&to= (default: today so far; app_sessions.RETENTION_DAYS back at most)."""
+    params = parse_qs(query)
+    midnight = datetime.datetime.combine(datetime.date.today(), datetime.time()).timestamp()
+    start = parse_time(params.get("from", [None])[0], midnight)
+    end = parse_time(params.get("to", [None])[0], time.time())
+    apps = sessions.totals(start, end)
+    return {"from": start, "to": end, "total_seconds": round(sum(apps.values()), 1), "apps": apps}
+
+MAX_HISTORY_DAYS = 3660
+
+def history_range(query):
+    """/history?from=YYYY-MM-DD&to=YYYY-MM-DD (inclusive; default the last 30 days)."""
+    params = parse_qs(query)
+    today = datetime.date.today()
+    last = datetime.date.fromisoformat(params.get("to", [today.isoformat()])[0])
+    first = datetime.date.fromisoformat(params.get("from", [(last - datetime.timedelta(days=29)).isoformat()])[0])
+    if first > last or (last - first).days >= MAX_HISTORY_DAYS:
+        raise ValueError("bad range")
+    minutes = params.get("minutes", ["1"])[0] != "0"
+    return first, last, minutes
+
 class StatsHandler(BaseHTTPRequestHandler):
     def do_GET(self):
-        if self.path == '/stats':
-            self.send_response(200)
-            self.send_header('Content-type', 'application/json')
-            self.send_header('Access-Control-Allow-Origin', '*') # CORS
-            self.end_headers()
-            self.wfile.write(json.dumps(stats).encode())
+        url = urlsplit(self.path)
+        if url.path == '/stats':
+            self.send_snapshot(parse_qs(url.query).get("since", [None])[0])
+        elif url.path == '/history':
+            try:
+                first, last, minutes = history_range(url.query)
+            except ValueError:
+                self.send_json({"error": "from/to must be YYYY-MM-DD, from <= to"}, 400)
+                return
+            self.send_history(first, last, minutes)
+        elif url.path == '/stats/apps':
+            try:
+                self.send_json(app_totals(url.query))
+            except ValueError:
+                self.send_json({"error": "from/to must be epoch seconds or ISO dates"}, 400)
         else:
             self.send_response(404)
             self.end_headers()
 
+    def send_snapshot(self, since):
+        """Pre-encoded stats; with ?since=<version>, waits until there is something newer."""
+        if since is None:
+            version, body = snapshot.current()
+        else:
+            try:
+                version, body = snapshot.wait_newer(int(since))
+            except ValueError:
+                self.send_json({"error": "since must be a version number"}, 400)
+                return
+        self.send_response(200)
+        self.send_header('Content-type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.send_header('Cache-Control', 'no-cache')
+        self.send_header('ETag', f'"{version}"')
+        self.send_header('Access-Control-Allow-Origin', '*') # CORS
+        self.end_headers()
+        self.wfile.write(body)
+
+    def send_history(self, first, last, minutes):
+        """Streams a JSON array, one day record at a time (no Content-Length, closes when done)."""
+        self.send_response(200)
+        self.send_header('Content-type', 'application/json')
+        self.send_header('Access-Control-Allow-Origin', '*') # CORS
+        self.end_headers()
+        self.wfile.write(b"[")
+        for i, day in enumerate(history.iter_days(first, last)):
+            if not minutes:
+                del day["minutes"]
+            self.wfile.write((",\n" if i else "").encode() + json.dumps(day).encode())
+        self.wfile.write(b"]")
+
+    def send_json(self, payload, status=200):
+        self.send_response(status)
+        self.send_header('Content-type', 'application/json')
+        self.send_header('Access-Control-Allow-Origin', '*') # CORS
+        self.end_headers()
+        self.wfile.write(json.dumps(payload).encode())
+
     def log_message(self, format, *args):
         return # Silent logs
 
 def run_server():
-    server = HTTPServer(('localhost', PORT), StatsHandler)
+    # One thread per connection, so waiting long-poll requests don't block anyone
+    server = ThreadingHTTPServer(('localhost', PORT), StatsHandler)
+    server.daemon_threads = True
     print(f"Cognia Native Bridge running on http://localhost:{PORT}")
     server.serve_forever()
 
@@ -1,12 +1,19 @@
+const STATS_URL = 'http://localhost:8080/stats';
+const BRIDGE_RETRY_MS = 5000;
+
+const sleep = (ms: number) => new Promise(resolve => setTimeout(resolve, ms));
+
 class SessionService {
     private totalActiveTime: number = parseInt(localStorage.getItem('cognia_total_active_seconds') || '0', 10);
     private deviceTotalSeconds: number = 0;
+    private deviceStatsVersion: number | null = null;
     private lastUpdate: number = Date.now();
 
     constructor() {
         if (typeof window !== 'undefined') {
             this.initListeners();
             this.startTicker();
+            this.pollDeviceStats();
         }
     }
 
@@ -38,15 +45,27 @@ class SessionService {
         }
     }
 
-    private async fetchDeviceStats() {
-        try {
-            const res = await fetch('http://localhost:8080/stats');
-            if (res.ok) {
+    private async pollDeviceStats() {
+        // Long-poll: with ?since=<version> the bridge answers as soon as the
+        // stats change (or after its timeout), so an idle tab costs one open request
+        while (true) {
+            try {
+                const url = this.deviceStatsVersion === null
+                    ? STATS_URL
+                    : `${STATS_URL}?since=${this.deviceStatsVersion}`;
+                const res = await fetch(url);
+                if (!res.ok) {
+                    await sleep(BRIDGE_RETRY_MS);
+                    continue;
+                }
                 const data = await res.json();
                 this.deviceTotalSeconds = data.total_seconds;
+                this.deviceStatsVersion = data.version;
+            } catch (e) {
+                // Bridge might not be running; a restarted one counts versions from 1 again
+                this.deviceStatsVersion = null;
+                await sleep(BRIDGE_RETRY_MS);
             }
-        } catch (e) {
-            // Bridge might not be running, fail silently
         }
     }
 
@@ -55,7 +74,6 @@ class SessionService {
             if (!document.hidden) {
                 this.updateTotal();
             }
-            this.fetchDeviceStats();
         }, 5000); // Sync every 5 seconds
     }
 
@@ -0,0 +1,123 @@
+import json
+import os
+
+# ==========================================
+# SCREEN-TIME WRITE-AHEAD LOG
+# ==========================================
+# Every credited tick is one small append ("<seq> <day> <seconds>\n",
+# a single write() on an O_APPEND descriptor). Now and then the full
+# stats are checkpointed: written to a temp file, fsynced and renamed
+# over the state file, which also records the last seq it includes.
+#
+# The previous checkpoint is kept as <state>.prev, and the log is rotated
+# rather than truncated: <wal>.prev holds the ticks between the previous
+# checkpoint and the current one. So if the current checkpoint can't be
+# read, the previous one plus both logs rebuilds the same total. On
+# startup the newest readable checkpoint is loaded and every log record
+# with a higher seq is replayed, so a crash at any point loses nothing
+# and counts nothing twice.
+
+
+class StatsWAL:
+    def __init__(self, state_path, wal_path):
+        self.state_path = state_path
+        self.wal_path = wal_path
+        self.prev_state_path = state_path + ".prev"
+        self.prev_wal_path = wal_path + ".prev"
+        self.seq = 0
+        self._fd = None
+
+    # --- Startup ---
+
+    def load(self, default):
+        """Newest readable checkpoint + replayed logs -> stats dict (`default` if there is neither)."""
+        stats = None
+        for path in (self.state_path, self.prev_state_path):
+            stats = self._read_checkpoint(path)
+            if stats is not None:
+                if path == self.prev_state_path:
+                    print(f"Using the previous checkpoint {path}")
+                break
+        if stats is None:
+            stats = dict(default)
+        self.seq = stats.pop("wal_seq", 0)
+
+        replayed = 0
+        for seq, day, seconds in self._records():
+            if seq <= self.seq:
+                continue  # Already in the checkpoint
+            if day != stats.get("last_reset"):
+                if day < stats.get("last_reset", ""):
+                    continue
+                stats = {"total_seconds": 0, "last_reset": day}
+            stats["total_seconds"] += seconds
+            self.seq = seq
+            replayed += 1
+        if replayed:
+            print(f"Replayed {replayed} ticks from {self.wal_path}")
+        return stats
+
+    @staticmethod
+    def _read_checkpoint(path):
+        try:
+            with open(path, "r") as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return None
+        except ValueError:
+            print(f"Could not read {path}")
+            return None
+
+    def _records(self):
+        """Records of the rotated log, then the current one (seqs ascending)."""
+        for path in (self.prev_wal_path, self.wal_path):
+            yield from self._read_log(path)
+
+    @staticmethod
+    def _read_log(path):
+        try:
+            with open(path, "rb") as f:
+                data = f.read()
+        except FileNotFoundError:
+            return
+        end = data.rfind(b"\n") + 1
+        if end < len(data):
+            # Torn last append: cut it so the next record starts on a fresh line
+            with open(path, "r+b") as f:
+                f.truncate(end)
+        for line in data[:end].splitlines():
+            try:
+                seq, day, seconds = line.decode().split()
+                yield int(seq), day, int(seconds)
+            except ValueError:
+                continue
+
+    # --- Writing ---
+
+    def append(self, day, seconds):
+        """Logs `seconds` credited to `day`. One write() syscall, no fsync."""
+        if self._fd is None:
+            self._fd = os.open(self.wal_path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+        self.seq += 1
+        os.write(self._fd, f"{self.seq} {day} {seconds}\n".encode())
+
+    def checkpoint(self, stats):
+        """
+        Atomically replaces the state file with `stats`, keeping the old one
+        as .prev, then rotates the log (the ticks since the old checkpoint
+        become .prev, replacing the ones before it).
+        """
+        tmp = self.state_path + ".tmp"
+        with open(tmp, "w") as f:
+            json.dump(dict(stats, wal_seq=self.seq), f)
+            f.flush()
+            os.fsync(f.fileno())
+        if os.path.exists(self.state_path):
+            os.replace(self.state_path, self.prev_state_path)
+        os.replace(tmp, self.state_path)
+        # A crash anywhere in here only leaves records the seq check skips
+        if self._fd is not None:
+            os.close(self._fd)
+            self._fd = None
+        if os.path.exists(self.wal_path):
+            os.replace(self.wal_path, self.prev_wal_path)
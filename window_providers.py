@@ -0,0 +1,241 @@
+import os
+import re
+import shutil
+import subprocess
+import sys
+import threading
+
+# ==========================================
+# ACTIVE-WINDOW PROVIDERS
+# ==========================================
+# A provider reports focus changes: start(callback) calls callback(app)
+# every time the frontmost application changes (app = None when nothing
+# is focused or the provider lost track). Nothing is forked per poll:
+#   - macos: one long-lived JXA helper (osascript) that prints a line on change
+#   - x11:   python-xlib PropertyNotify on _NET_ACTIVE_WINDOW, or a
+#            long-lived `xprop -spy` helper when python-xlib isn't installed
+#   - fake:  driven by hand (tests / demos)
+
+HELPER_RESTART_DELAY = 2  # Seconds before restarting a helper that died
+MAC_HELPER_INTERVAL = 0.5  # How often the JXA helper looks at the frontmost app
+
+
+class WindowProvider:
+    name = None
+
+    def __init__(self):
+        self._callback = None
+        self._current = None
+        self._stopped = threading.Event()
+
+    def start(self, callback):
+        self._callback = callback
+        self._stopped.clear()
+        threading.Thread(target=self._run, name=f"{self.name}-provider", daemon=True).start()
+
+    def stop(self):
+        self._stopped.set()
+
+    def current(self):
+        """Last reported frontmost app (None if unknown)."""
+        return self._current
+
+    def _emit(self, app):
+        app = app or None
+        if app == self._current:
+            return
+        self._current = app
+        if self._callback:
+            self._callback(app)
+
+    def _run(self):
+        raise NotImplementedError
+
+
+class HelperProcessProvider(WindowProvider):
+    """Runs one long-lived helper and turns each stdout line into a focus event."""
+
+    def command(self):
+        raise NotImplementedError
+
+    def parse(self, line):
+        return line.strip()
+
+    def _run(self):
+        while not self._stopped.is_set():
+            try:
+                self._proc = subprocess.Popen(
+                    self.command(), stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, text=True, bufsize=1
+                )
+                for line in self._proc.stdout:
+                    if self._stopped.is_set():
+                        break
+                    self._emit(self.parse(line))
+            except Exception as e:
+                print(f"{self.name} provider: {e}")
+            finally:
+                self._kill()
+            self._emit(None)
+            self._stopped.wait(HELPER_RESTART_DELAY)
+
+    def _kill(self):
+        proc = getattr(self, "_proc", None)
+        if proc and proc.poll() is None:
+            proc.terminate()
+
+    def stop(self):
+        super().stop()
+        self._kill()
+
+
+# --- macOS ---
+
+MAC_HELPER_SCRIPT = """
+ObjC.import('Foundation');
+var se = Application('System Events');
+var out = $.NSFileHandle.fileHandleWithStandardOutput;
+var last = null;
+while (true) {
+    var name = '';
+    try { name = se.processes.whose({frontmost: true})[0].name(); } catch (e) {}
+    if (name !== last) {
+        out.writeData($(name + '\\n').dataUsingEncoding($.NSUTF8StringEncoding));
+        last = name;
+    }
+    delay(%s);
+}
+"""
+
+
+class MacOSProvider(HelperProcessProvider):
+    name = "macos"
+
+    def command(self):
+        return ["osascript", "-l", "JavaScript", "-e", MAC_HELPER_SCRIPT % MAC_HELPER_INTERVAL]
+
+
+# --- Linux / X11 ---
+
+def process_name(pid):
+    """Executable name of a pid from /proc (None if it is gone)."""
+    try:
+        with open(f"/proc/{int(pid)}/comm", "r") as f:
+            return f.read().strip() or None
+    except (OSError, ValueError):
+        return None
+
+
+class XpropProvider(HelperProcessProvider):
+    """`xprop -spy` prints the root's _NET_ACTIVE_WINDOW on every change."""
+    name = "x11"
+    WINDOW_ID = re.compile(r"window id # (0x[0-9a-fA-F]+)")
+
+    def command(self):
+        return ["xprop", "-spy", "-root", "_NET_ACTIVE_WINDOW"]
+
+    def parse(self, line):
+        match = self.WINDOW_ID.search(line)
+        if not match or int(match.group(1), 16) == 0:
+            return None
+        # One lookup per focus change (not per poll): pid -> /proc, else WM_CLASS
+        try:
+            props = subprocess.check_output(
+                ["xprop", "-id", match.group(1), "_NET_WM_PID", "WM_CLASS"],
+                stderr=subprocess.DEVNULL, text=True, timeout=2
+            )
+        except Exception:
+            return None
+        pid = re.search(r"_NET_WM_PID\(CARDINAL\) = (\d+)", props)
+        name = process_name(pid.group(1)) if pid else None
+        if name:
+            return name
+        wm_class = re.findall(r'"([^"]*)"', props)
+        return wm_class[-1] if wm_class else None
+
+
+class XlibProvider(WindowProvider):
+    """Native X11 listener (python-xlib): blocks on PropertyNotify, no helper at all."""
+    name = "x11"
+
+    def _run(self):
+        from Xlib import X, display
+
+        disp = display.Display()
+        root = disp.screen().root
+        active_atom = disp.intern_atom("_NET_ACTIVE_WINDOW")
+        pid_atom = disp.intern_atom("_NET_WM_PID")
+        root.change_attributes(event_mask=X.PropertyChangeMask)
+
+        def active_app():
+            prop = root.get_full_property(active_atom, X.AnyPropertyType)
+            if not prop or not prop.value or not prop.value[0]:
+                return None
+            try:
+                window = disp.create_resource_object("window", prop.value[0])
+                pid = window.get_full_property(pid_atom, X.AnyPropertyType)
+                if pid and pid.value:
+                    name = process_name(pid.value[0])
+                    if name:
+                        return name
+                wm_class = window.get_wm_class()
+                return wm_class[-1] if wm_class else None
+            except Exception:
+                return None  # Window closed in the meantime
+
+        self._emit(active_app())
+        while not self._stopped.is_set():
+            event = disp.next_event()
+            if event.type == X.PropertyNotify and event.atom == active_atom:
+                self._emit(active_app())
+
+
+def x11_provider():
+    try:
+        import Xlib.display  # noqa: F401 (optional dependency)
+        return XlibProvider()
+    except ImportError:
+        if shutil.which("xprop"):
+            return XpropProvider()
+        raise RuntimeError("X11 tracking needs python-xlib or the xprop tool")
+
+
+# --- Tests / demos ---
+
+class FakeProvider(WindowProvider):
+    """Focus changes come from focus() calls (or a scripted list of (delay, app) steps)."""
+    name = "fake"
+
+    def __init__(self, script=()):
+        super().__init__()
+        self.script = list(script)
+
+    def focus(self, app):
+        self._emit(app)
+
+    def _run(self):
+        for delay, app in self.script:
+            if self._stopped.wait(delay):
+                return
+            self._emit(app)
+
+
+# --- Selection ---
+
+PROVIDERS = {
+    "macos": MacOSProvider,
+    "x11": x11_provider,
+    "fake": FakeProvider,
+}
+
+
+def get_provider(name=None):
+    """By name (or $SCREEN_TRACKER_PROVIDER), else whatever fits this machine."""
+    name = name or os.getenv("SCREEN_TRACKER_PROVIDER")
+    if not name:
+        if sys.platform == "darwin":
+            name = "macos"
+        elif sys.platform.startswith("linux") and os.getenv("DISPLAY"):
+            name = "x11"
+        else:
+            raise RuntimeError("No active-window provider for this platform; set SCREEN_TRACKER_PROVIDER")
+    return PROVIDERS[name]()